@@ -1,16 +1,45 @@
 import json
+import os
+from functools import lru_cache
 from pathlib import Path
+from typing import Any, Dict
 
+from Libraries import json_io
 from Libraries.reference_data import get_source_datasets_dir
 
 
-def load_dataset(source_dataset: str):
-    source_dir = get_source_datasets_dir()
-    path = source_dir / f"{source_dataset}.json"
+def _dataset_path(source_dataset: str) -> Path:
+    path = get_source_datasets_dir() / f"{source_dataset}.json"
     if not path.is_file():
         raise SystemExit(f"Dataset file not found: {path}")
+    return path
+
+
+def _parse_dataset(path: Path):
     try:
-        with path.open("r", encoding="utf-8") as f:
-            return json.load(f)
+        return json_io.loads(path.read_bytes())
     except json.JSONDecodeError as exc:
         raise SystemExit(f"Failed to parse dataset JSON at {path}: {exc}")
+
+
+def load_dataset(source_dataset: str):
+    return _parse_dataset(_dataset_path(source_dataset))
+
+
+@lru_cache(maxsize=8)
+def _section_index(path: Path, mtime_ns: int, size: int) -> Dict[Any, dict]:
+    # mtime_ns and size only key the cache so an edited dataset is re-read.
+    index: Dict[Any, dict] = {}
+    for section in _parse_dataset(path).get("sections", []):
+        index.setdefault(section.get("section"), section)
+    return index
+
+
+def load_section_index(source_dataset: str) -> Dict[Any, dict]:
+    """
+    Map each section number in a dataset to its section object. The result is
+    cached per file version; callers must treat it as read-only.
+    """
+    path = _dataset_path(source_dataset)
+    st = os.stat(path)
+    return _section_index(path, st.st_mtime_ns, st.st_size)
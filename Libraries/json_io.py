@@ -0,0 +1,48 @@
+"""JSON helpers: orjson when it is installed, the stdlib json module otherwise."""
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """
+    Parse JSON from str or bytes.
+
+    orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers can keep
+    catching json.JSONDecodeError either way.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any) -> str:
+    """Serialize obj in the project format (ensure_ascii=False, indent=2)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, indent=2)
+
+
+def dumps_bytes(obj: Any, append_newline: bool = False) -> bytes:
+    """
+    Like dumps(), but UTF-8 encoded; orjson produces the bytes directly.
+    append_newline adds a trailing "\n" without a second copy of the buffer.
+    """
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+        if append_newline:
+            option |= orjson.OPT_APPEND_NEWLINE
+        return orjson.dumps(obj, option=option)
+    text = json.dumps(obj, ensure_ascii=False, indent=2)
+    return (text + "\n" if append_newline else text).encode("utf-8")
+
+
+def dumps_compact(obj: Any) -> str:
+    """Serialize obj without indentation or separator spaces (ensure_ascii=False)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
@@ -1,13 +1,26 @@
-import json
 import os
+import threading
+from functools import lru_cache
 from pathlib import Path
+from typing import Any, Dict, Tuple
+
+from Libraries import json_io
+
+# Parsed JSON keyed by path, tagged with the (st_mtime_ns, st_size) it was read at.
+_JSON_CACHE: Dict[str, Tuple[Tuple[int, int], Any]] = {}
+_JSON_CACHE_LOCK = threading.Lock()
+
+
+@lru_cache(maxsize=4)
+def _database_path(db: str) -> Path:
+    return Path(db)
 
 
 def get_database_path() -> Path:
     db = os.environ.get("VOCAB_HUNTERS_DB_PATH")
     if not db:
         raise RuntimeError("VOCAB_HUNTERS_DB_PATH is not set.")
-    return Path(db)
+    return _database_path(db)
 
 
 def ensure_database_dirs():
@@ -40,11 +53,31 @@ def get_user_themes_dir() -> Path:
     return get_database_path() / "user_themes"
 
 
+def _file_stamp(path: Path) -> Tuple[str, int, int]:
+    st = os.stat(path)
+    return (str(path), st.st_mtime_ns, st.st_size)
+
+
+def _load_json_cached(path: Path) -> Any:
+    """
+    Parse a JSON file, reusing the previous result while the file's mtime and
+    size are unchanged. Callers must treat the returned object as read-only.
+    """
+    key, mtime_ns, size = _file_stamp(path)
+    stat_key = (mtime_ns, size)
+    cached = _JSON_CACHE.get(key)
+    if cached is not None and cached[0] == stat_key:
+        return cached[1]
+    data = json_io.loads(Path(key).read_bytes())
+    with _JSON_CACHE_LOCK:
+        _JSON_CACHE[key] = (stat_key, data)
+    return data
+
+
 def load_source_datasets():
     reference_data_path = get_reference_data_path()
     source_datasets_path = reference_data_path / "source_datasets.json"
-    with open(source_datasets_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    data = _load_json_cached(source_datasets_path)
     if isinstance(data, dict):
         data = [data]
     if not isinstance(data, list):
@@ -66,19 +99,20 @@ def load_source_datasets():
     return data_sources
 
 
+@lru_cache(maxsize=1)
+def _source_datasets_index(stamp: Tuple[str, int, int]) -> Dict[str, Dict[str, Any]]:
+    return {item["key_name"]: item for item in load_source_datasets()}
+
+
 def lookup_source_dataset(key_name):
-    datasets = load_source_datasets()
-    lookup = {
-        item.get("key_name"): item for item in datasets if item.get("key_name")
-    }
-    return lookup.get(key_name)
+    stamp = _file_stamp(get_reference_data_path() / "source_datasets.json")
+    return _source_datasets_index(stamp).get(key_name)
 
 
 def load_themes():
     reference_data_path = get_reference_data_path()
     themes_path = reference_data_path / "themes.json"
-    with open(themes_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    data = _load_json_cached(themes_path)
     if isinstance(data, dict):
         data = [data]
     if not isinstance(data, list):
@@ -103,7 +137,19 @@ def load_themes():
     return themes
 
 
+@lru_cache(maxsize=1)
+def _themes_index(stamp: Tuple[str, int, int]) -> Dict[str, Dict[str, Any]]:
+    return {item["key_name"]: item for item in load_themes()}
+
+
 def lookup_theme(key_name):
-    themes = load_themes()
-    lookup = {item.get("key_name"): item for item in themes if item.get("key_name")}
-    return lookup.get(key_name)
+    stamp = _file_stamp(get_reference_data_path() / "themes.json")
+    return _themes_index(stamp).get(key_name)
+
+
+def clear_reference_data_cache():
+    """Drop all memoized reference data so the next call re-reads from disk."""
+    with _JSON_CACHE_LOCK:
+        _JSON_CACHE.clear()
+    _source_datasets_index.cache_clear()
+    _themes_index.cache_clear()
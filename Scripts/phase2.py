@@ -4,12 +4,18 @@ import json
 import sys
 import hashlib
 import logging
+import operator
+import os
+import re
+import string
+import threading
+from functools import lru_cache
 from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
 
 from flask import current_app, has_app_context
-from phase3 import run_with_json as run_phase3_with_json
-from phase4 import run_phase4_with_json
 
+from Libraries import json_io
 from Libraries.reference_data import (
     get_reference_data_path,
     get_responses_datastore_path,
@@ -17,6 +23,44 @@ from Libraries.reference_data import (
     lookup_theme,
 )
 
+# Worksheet id bit layout, seed in the lowest bits. Changing any of these
+# invalidates every worksheet id already handed out (URLs, QR codes).
+_DATASET_BITS = 16
+_THEME_BITS = 16
+_MODEL_BITS = 8
+_READING_BITS = 10
+_SECTION_BITS = 10
+_SEED_BITS = 8
+
+_SEED_SHIFT = 0
+_SECTION_SHIFT = _SEED_SHIFT + _SEED_BITS
+_READING_SHIFT = _SECTION_SHIFT + _SECTION_BITS
+_MODEL_SHIFT = _READING_SHIFT + _READING_BITS
+_THEME_SHIFT = _MODEL_SHIFT + _MODEL_BITS
+_DATASET_SHIFT = _THEME_SHIFT + _THEME_BITS
+
+_DATASET_MASK = (1 << _DATASET_BITS) - 1
+_THEME_MASK = (1 << _THEME_BITS) - 1
+_MODEL_MASK = (1 << _MODEL_BITS) - 1
+_READING_MASK = (1 << _READING_BITS) - 1
+_SECTION_MASK = (1 << _SECTION_BITS) - 1
+_SEED_MASK = (1 << _SEED_BITS) - 1
+
+# Reversible obfuscation: XOR with a fixed 68-bit key
+_OBFUSCATION_KEY = 0xA5A5A5A5A5A5A5A5A
+
+# "{name}" placeholders in presentation_metadata templates
+_PLACEHOLDER_RE = re.compile(r"\{(\w+)\}")
+
+# Fountas & Pinnell letter -> reading_level_id ('A'/'a' -> 0 ... 'Z'/'z' -> 25)
+_FP_LEVEL_IDS = {c: i for i, c in enumerate(string.ascii_uppercase)}
+_FP_LEVEL_IDS.update({c.lower(): i for c, i in _FP_LEVEL_IDS.items()})
+
+_READING_LEVEL_FIELDS = operator.itemgetter("system", "level")
+
+# Cache directories this process has already created
+_CREATED_CACHE_DIRS = set()
+
 class Phase2Error(Exception):
     def __init__(self, message, exit_code=1):
         super().__init__(message)
@@ -29,6 +73,11 @@ def get_logger():
     return logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=256)
+def _format_reading_level_segment(system: str, level: str) -> str:
+    return f"{system}_{level}"
+
+
 def build_reading_level_segment(reading_level):
     """
     Convert the reading_level object to a path segment.
@@ -38,13 +87,22 @@ def build_reading_level_segment(reading_level):
 
     Falls back to str(reading_level) if it's not a dict or fields are missing.
     """
-    if isinstance(reading_level, dict):
-        system = reading_level.get("system")
-        level = reading_level.get("level")
-        if system is not None and level is not None:
-            return f"{system}_{level}"
-    # Fallback: just stringify whatever we got
-    return str(reading_level)
+    try:
+        system, level = _READING_LEVEL_FIELDS(reading_level)
+    except (KeyError, TypeError):
+        system = level = None
+    if system is None or level is None:
+        # Fallback: just stringify whatever we got
+        return str(reading_level)
+    return _format_reading_level_segment(str(system), str(level))
+
+
+def interpolate_placeholders(template: str, variables: Dict[str, str]) -> str:
+    """
+    Replace each {name} in template with variables[name] in a single pass.
+    Unknown placeholders (e.g. {current_page}, filled in by phase5) are kept.
+    """
+    return _PLACEHOLDER_RE.sub(lambda m: variables.get(m.group(1), m.group(0)), template)
 
 
 def parse_args(argv=None):
@@ -53,68 +111,89 @@ def parse_args(argv=None):
     )
     return parser.parse_args(argv)
 
-def build_worksheet_id(request):
+@lru_cache(maxsize=16)
+def _load_reference_list(ref_path: Path, mtime_ns: int, size: int) -> Optional[Tuple[Any, ...]]:
     """
-    Encode source_dataset, theme, reading_level, model, section, and seed into an opaque
-    but reversible integer worksheet_id.
-
-    - Lookups reference data files from the standardized database path
-    - Encodes IDs using bit packing and reversible obfuscation
-    - Exits with non-zero code if any lookup fails
+    Parse a reference data file (a list, or a single object treated as a
+    one-item list). Returns None if the top level is neither. mtime_ns and
+    size are part of the cache key so an edited file is re-read.
     """
-    reference_data_dir = get_reference_data_path()
+    data = json_io.loads(ref_path.read_bytes())
+    if isinstance(data, dict):
+        data = [data]
+    if not isinstance(data, list):
+        return None
+    return tuple(data)
+
 
-    # Extract required fields from request
+def _reference_data(reference_data_dir: Path, filename: str, field_name: str, error_cls):
+    """
+    Stat and load a reference data file, raising error_cls on failure.
+    Returns ((ref_path, mtime_ns, size), items).
+    """
+    ref_path = reference_data_dir / filename
     try:
-        source_dataset = request["source_dataset"]
-        theme = request["theme"]
-        reading_level = request["reading_level"]
-        model = request["model"]
-        section = request["section"]
-        seed = request["seed"]
-    except KeyError as e:
-        raise SystemExit(f"Request missing required field for worksheeet_id: {e}") from e
+        st = os.stat(ref_path)
+        stamp = (ref_path, st.st_mtime_ns, st.st_size)
+        items = _load_reference_list(*stamp)
+    except (OSError, json.JSONDecodeError) as e:
+        raise error_cls(f"Failed to load reference data from {filename} ({field_name}): {e}") from e
+    if items is None:
+        raise error_cls(f"Reference file {filename} ({field_name}) is not a list or object.")
+    return stamp, items
+
+
+@lru_cache(maxsize=16)
+def _keyname_index(ref_path: Path, mtime_ns: int, size: int) -> Dict[str, int]:
+    """Map each key_name in a loaded reference data file to its list position."""
+    index: Dict[str, int] = {}
+    for idx, item in enumerate(_load_reference_list(ref_path, mtime_ns, size)):
+        key_name = item.get("key_name")
+        if key_name is not None and key_name not in index:
+            index[key_name] = idx
+    return index
+
+
+@lru_cache(maxsize=4096)
+def _worksheet_id(
+    dataset_stamp: tuple,
+    theme_stamp: tuple,
+    model_stamp: tuple,
+    source_dataset: str,
+    theme: str,
+    reading_level_key: tuple,
+    model: str,
+    section: Any,
+    seed: Any,
+) -> str:
+    """
+    Memoized core of build_worksheet_id. The reference file stamps are part of
+    the cache key so edited reference data yields fresh IDs; reading_level_key
+    is ("dict", system, level) or ("value", reading_level).
+    """
 
-    # Helper: load reference file and return list of items
-    def load_list(filename, field_name):
-        ref_path = reference_data_dir / filename
+    def lookup_index(stamp, key_name):
         try:
-            with open(ref_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            if isinstance(data, dict):
-                data = [data]
-            if not isinstance(data, list):
-                raise SystemExit(f"Reference file {filename} ({field_name}) is not a list or object.")
-            return data
-        except (OSError, json.JSONDecodeError) as e:
-            raise SystemExit(f"Failed to load reference data from {filename} ({field_name}): {e}") from e
-
-    # Load lists and compute index mapping based on key_name
-    datasets = load_list("source_datasets.json", "source_dataset")
-    themes = load_list("themes.json", "theme")
-    models = load_list("models.json", "model")
-
-    def find_index_by_keyname(items, key_name, filename):
-        for idx, item in enumerate(items):
-            if item.get("key_name") == key_name:
-                return idx
-        raise SystemExit(f"Could not find key_name '{key_name}' in {filename}.")
-
-    dataset_idx = find_index_by_keyname(datasets, source_dataset, "source_datasets.json")
-    theme_idx = find_index_by_keyname(themes, theme, "themes.json")
-    model_idx = find_index_by_keyname(models, model, "models.json")
+            return _keyname_index(*stamp)[key_name]
+        except KeyError:
+            raise SystemExit(f"Could not find key_name '{key_name}' in {stamp[0].name}.") from None
+
+    dataset_idx = lookup_index(dataset_stamp, source_dataset)
+    theme_idx = lookup_index(theme_stamp, theme)
+    model_idx = lookup_index(model_stamp, model)
 
     # Find reading_level_id
-    if isinstance(reading_level, dict):
-        reading_system = reading_level.get("system", None)
-        reading_level_val = reading_level.get("level", None)
+    if reading_level_key[0] == "dict":
+        _, reading_system, reading_level_val = reading_level_key
         if reading_system is None or reading_level_val is None:
             raise SystemExit(
                 "reading_level must contain 'system' and 'level' keys."
             )
         if reading_system == "fp":
-            # 'A' -> 0, 'B' -> 1, etc.
-            reading_level_id = ord(str(reading_level_val).upper()) - ord('A')
+            reading_level_id = _FP_LEVEL_IDS.get(reading_level_val)
+            if reading_level_id is None:
+                # Non-letter values keep the historical arithmetic (and its range errors)
+                reading_level_id = ord(str(reading_level_val).upper()) - ord('A')
         elif reading_system == "grade":
             reading_level_id = int(reading_level_val) + 30
         else:
@@ -124,7 +203,7 @@ def build_worksheet_id(request):
     else:
         # Accept integers or numeric strings as fallback
         try:
-            reading_level_id = int(reading_level)
+            reading_level_id = int(reading_level_key[1])
         except Exception:
             raise SystemExit("reading_level must be a dict or integer-like value.") from None
 
@@ -139,59 +218,72 @@ def build_worksheet_id(request):
     except Exception:
         raise SystemExit("seed must be an integer or integer-like string.") from None
 
-    # Bit-size allocations (must match the spec)
-    DATASET_BITS = 16
-    THEME_BITS = 16
-    MODEL_BITS = 8
-    READING_BITS = 10
-    SECTION_BITS = 10
-    SEED_BITS = 8
-
-    # Validate index ranges
-    if not (0 <= dataset_idx < (1 << DATASET_BITS)):
-        raise SystemExit(f"dataset_idx {dataset_idx} out of range for {DATASET_BITS} bits")
-    if not (0 <= theme_idx < (1 << THEME_BITS)):
-        raise SystemExit(f"theme_idx {theme_idx} out of range for {THEME_BITS} bits")
-    if not (0 <= model_idx < (1 << MODEL_BITS)):
-        raise SystemExit(f"model_idx {model_idx} out of range for {MODEL_BITS} bits")
-    if not (0 <= reading_level_id < (1 << READING_BITS)):
-        raise SystemExit(f"reading_level_id {reading_level_id} out of range for {READING_BITS} bits")
-    if not (0 <= section_int < (1 << SECTION_BITS)):
-        raise SystemExit(f"section {section_int} out of range for {SECTION_BITS} bits")
-    if not (0 <= seed_int < (1 << SEED_BITS)):
-        raise SystemExit(f"seed {seed_int} out of range for {SEED_BITS} bits")
-
-    # Bit positions (seed lowest)
-    seed_shift = 0
-    section_shift = seed_shift + SEED_BITS
-    reading_shift = section_shift + SECTION_BITS
-    model_shift = reading_shift + READING_BITS
-    theme_shift = model_shift + MODEL_BITS
-    dataset_shift = theme_shift + THEME_BITS
-
-    packed = (
-        ((dataset_idx & ((1 << DATASET_BITS) - 1)) << dataset_shift)
-        | ((theme_idx & ((1 << THEME_BITS) - 1)) << theme_shift)
-        | ((model_idx & ((1 << MODEL_BITS) - 1)) << model_shift)
-        | ((reading_level_id & ((1 << READING_BITS) - 1)) << reading_shift)
-        | ((section_int & ((1 << SECTION_BITS) - 1)) << section_shift)
-        | ((seed_int & ((1 << SEED_BITS) - 1)) << seed_shift)
-    )
-
-    # Reversible obfuscation: XOR with a fixed 68-bit key
-    OBFUSCATION_KEY = 0xA5A5A5A5A5A5A5A5A
-    obfuscated = (packed ^ OBFUSCATION_KEY)
-
-    # Return as a lowercase hexadecimal string without the '0x' prefix (e.g. '1a2b3c').
+    # Validate index ranges; x & ~mask is non-zero for negatives and overflow alike
+    if dataset_idx & ~_DATASET_MASK:
+        raise SystemExit(f"dataset_idx {dataset_idx} out of range for {_DATASET_BITS} bits")
+    if theme_idx & ~_THEME_MASK:
+        raise SystemExit(f"theme_idx {theme_idx} out of range for {_THEME_BITS} bits")
+    if model_idx & ~_MODEL_MASK:
+        raise SystemExit(f"model_idx {model_idx} out of range for {_MODEL_BITS} bits")
+    if reading_level_id & ~_READING_MASK:
+        raise SystemExit(f"reading_level_id {reading_level_id} out of range for {_READING_BITS} bits")
+    if section_int & ~_SECTION_MASK:
+        raise SystemExit(f"section {section_int} out of range for {_SECTION_BITS} bits")
+    if seed_int & ~_SEED_MASK:
+        raise SystemExit(f"seed {seed_int} out of range for {_SEED_BITS} bits")
+
+    obfuscated = (
+        (dataset_idx << _DATASET_SHIFT)
+        | (theme_idx << _THEME_SHIFT)
+        | (model_idx << _MODEL_SHIFT)
+        | (reading_level_id << _READING_SHIFT)
+        | (section_int << _SECTION_SHIFT)
+        | (seed_int << _SEED_SHIFT)
+    ) ^ _OBFUSCATION_KEY
+
+    # Return as lowercase hex without the '0x' prefix, zero-padded to 17 digits
+    # (the full 68-bit width), grouped 5-4-4-4 with separators.
     # This is reversible: int(hex_string, 16) -> XOR with same key -> unpack bits
-    hex_digits = format(int(obfuscated), 'x')
+    h = format(obfuscated, '017x')
+    return f"{h[:5]}-{h[5:9]}-{h[9:13]}-{h[13:]}"
+
+
+def build_worksheet_id(
+    source_dataset: str,
+    theme: str,
+    reading_level: Any,
+    model: str,
+    section: Any,
+    seed: Any,
+    reference_data_dir: Optional[Path] = None,
+) -> str:
+    """
+    Encode source_dataset, theme, reading_level, model, section, and seed into an opaque
+    but reversible integer worksheet_id.
 
-    # Zero-pad hex digits to at least 17 characters (left-pad with zeros)
-    hex_padded = hex_digits.zfill(17)
+    - Lookups reference data files from reference_data_dir (defaults to the
+      standardized database path)
+    - Encodes IDs using bit packing and reversible obfuscation
+    - Exits with non-zero code if any lookup fails
+    """
+    if reference_data_dir is None:
+        reference_data_dir = get_reference_data_path()
 
-    # Insert separators
-    hex_str = hex_padded[:5] + '-' + hex_padded[5:9] + '-' + hex_padded[9:13] + '-' + hex_padded[13:]
-    return hex_str
+    dataset_stamp, _ = _reference_data(reference_data_dir, "source_datasets.json", "source_dataset", SystemExit)
+    theme_stamp, _ = _reference_data(reference_data_dir, "themes.json", "theme", SystemExit)
+    model_stamp, _ = _reference_data(reference_data_dir, "models.json", "model", SystemExit)
+
+    if isinstance(reading_level, dict):
+        reading_level_key = ("dict", reading_level.get("system", None), reading_level.get("level", None))
+    else:
+        reading_level_key = ("value", reading_level)
+    args = (dataset_stamp, theme_stamp, model_stamp, source_dataset, theme, reading_level_key, model, section, seed)
+    try:
+        hash(args)
+    except TypeError:
+        # Unhashable field values cannot key the cache; compute directly
+        return _worksheet_id.__wrapped__(*args)
+    return _worksheet_id(*args)
 
 
 def decode_worksheet_id(worksheet_id_str):
@@ -211,51 +303,21 @@ def decode_worksheet_id(worksheet_id_str):
         raise Phase2Error(f"Invalid worksheet ID hex: {e}") from e
 
     # Reverse XOR obfuscation
-    OBFUSCATION_KEY = 0xA5A5A5A5A5A5A5A5A
-    packed = obfuscated ^ OBFUSCATION_KEY
-
-    # Bit-size allocations (must match build_worksheet_id)
-    DATASET_BITS = 16
-    THEME_BITS = 16
-    MODEL_BITS = 8
-    READING_BITS = 10
-    SECTION_BITS = 10
-    SEED_BITS = 8
-
-    # Bit positions (seed lowest, same order as build)
-    seed_shift = 0
-    section_shift = seed_shift + SEED_BITS
-    reading_shift = section_shift + SECTION_BITS
-    model_shift = reading_shift + READING_BITS
-    theme_shift = model_shift + MODEL_BITS
-    dataset_shift = theme_shift + THEME_BITS
+    packed = obfuscated ^ _OBFUSCATION_KEY
 
     # Extract fields
-    seed_int = (packed >> seed_shift) & ((1 << SEED_BITS) - 1)
-    section_int = (packed >> section_shift) & ((1 << SECTION_BITS) - 1)
-    reading_level_id = (packed >> reading_shift) & ((1 << READING_BITS) - 1)
-    model_idx = (packed >> model_shift) & ((1 << MODEL_BITS) - 1)
-    theme_idx = (packed >> theme_shift) & ((1 << THEME_BITS) - 1)
-    dataset_idx = (packed >> dataset_shift) & ((1 << DATASET_BITS) - 1)
+    seed_int = (packed >> _SEED_SHIFT) & _SEED_MASK
+    section_int = (packed >> _SECTION_SHIFT) & _SECTION_MASK
+    reading_level_id = (packed >> _READING_SHIFT) & _READING_MASK
+    model_idx = (packed >> _MODEL_SHIFT) & _MODEL_MASK
+    theme_idx = (packed >> _THEME_SHIFT) & _THEME_MASK
+    dataset_idx = (packed >> _DATASET_SHIFT) & _DATASET_MASK
 
     reference_data_dir = get_reference_data_path()
 
-    def load_list(filename, field_name):
-        ref_path = reference_data_dir / filename
-        try:
-            with open(ref_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            if isinstance(data, dict):
-                data = [data]
-            if not isinstance(data, list):
-                raise Phase2Error(f"Reference file {filename} ({field_name}) is not a list or object.")
-            return data
-        except (OSError, json.JSONDecodeError) as e:
-            raise Phase2Error(f"Failed to load reference data from {filename} ({field_name}): {e}") from e
-
-    datasets = load_list("source_datasets.json", "source_dataset")
-    themes = load_list("themes.json", "theme")
-    models = load_list("models.json", "model")
+    _, datasets = _reference_data(reference_data_dir, "source_datasets.json", "source_dataset", Phase2Error)
+    _, themes = _reference_data(reference_data_dir, "themes.json", "theme", Phase2Error)
+    _, models = _reference_data(reference_data_dir, "models.json", "model", Phase2Error)
 
     # Map indices back to key_names
     if dataset_idx >= len(datasets):
@@ -296,6 +358,61 @@ def decode_worksheet_id(worksheet_id_str):
     }
 
 
+@lru_cache(maxsize=128)
+def _read_payload_bytes(path: Path, mtime_ns: int, size: int) -> bytes:
+    """
+    Read a cached payload file. mtime_ns and size are part of the cache key so
+    a regenerated file is re-read. Returns bytes (immutable) so every caller
+    parses its own dict and can mutate it freely.
+    """
+    return path.read_bytes()
+
+
+def _write_cache_payload(cache_path: Path, data: bytes) -> None:
+    """
+    Write data to cache_path via a per-writer temp file and os.replace, so
+    concurrent readers never see a half-written payload. Parent directories
+    are created once per process; if one has since been removed, it is
+    recreated and the write retried.
+    """
+    parent = cache_path.parent
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    for attempt in range(2):
+        try:
+            if parent not in _CREATED_CACHE_DIRS:
+                parent.mkdir(parents=True, exist_ok=True)
+                _CREATED_CACHE_DIRS.add(parent)
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, cache_path)
+            return
+        except FileNotFoundError as e:
+            _CREATED_CACHE_DIRS.discard(parent)
+            if attempt:
+                raise Phase2Error(f"Failed to write cache file: {e}") from e
+        except OSError as e:
+            tmp_path.unlink(missing_ok=True)
+            raise Phase2Error(f"Failed to write cache file: {e}") from e
+
+
+def cache_dir_for(request: Dict[str, Any]) -> Path:
+    """
+    Directory holding every cached episode (seed) for request's
+    {responses_datastore}/{source_dataset}/{reading_level}/{section}/{theme}/{model}.
+    """
+    return get_responses_datastore_path().joinpath(
+        str(request["source_dataset"]),
+        build_reading_level_segment(request["reading_level"]),
+        str(request["section"]),
+        str(request["theme"]),
+        str(request["model"]),
+    )
+
+
+def cache_path_for(request: Dict[str, Any]) -> Path:
+    """Cache file for request: cache_dir_for(request) / "{seed}.json"."""
+    return cache_dir_for(request) / f"{request['seed']}.json"
+
+
 def process_request(request):
     logger = get_logger()
     # Extract required fields from the request
@@ -309,63 +426,68 @@ def process_request(request):
     except KeyError as e:
         raise Phase2Error(f"Missing required field in request JSON: {e}") from e
 
-    reading_level_segment = build_reading_level_segment(reading_level)
-    worksheet_id = build_worksheet_id(request)
-
-    datastore_root = get_responses_datastore_path()
-
-    # Build expected cache file path:
-    # {responses_datastore}/{source_dataset}/{reading_level}/{section}/{theme}/{model}/{seed}.json
-    cache_path = (
-        datastore_root
-        / str(source_dataset)
-        / reading_level_segment
-        / str(section)
-        / str(theme)
-        / str(model)
-        / f"{seed}.json"
-    )
+    reference_data_dir = get_reference_data_path()
+    worksheet_id = None
+
+    def get_worksheet_id():
+        # Only the cache-miss path and presentation_metadata need the id
+        nonlocal worksheet_id
+        if worksheet_id is None:
+            worksheet_id = build_worksheet_id(
+                source_dataset, theme, reading_level, model, section, seed, reference_data_dir
+            )
+        return worksheet_id
 
-    if not cache_path.is_file():
-        phase_3_input_json = json.dumps(request, ensure_ascii=False)
-        # Remove presentation_metadata from phase3 input
-        phase_3_input = json.loads(phase_3_input_json)
-        phase_3_input.pop("presentation_metadata", None)
+    cache_path = cache_path_for(request)
 
-        # Build and add worksheet_id
-        phase_3_input["worksheet_id"] = worksheet_id
+    try:
+        cache_stat = os.stat(cache_path)
+    except FileNotFoundError:
+        cache_stat = None
+    except OSError as e:
+        raise Phase2Error(f"Failed to read/parse cache file: {e}") from e
+
+    if cache_stat is None:
+        # phase3/phase4 pull in the OpenAI SDK and pydantic; a cache hit never needs them
+        try:
+            from phase3 import run_from_dict as run_phase3_from_dict
+            from phase4 import Phase4Error, run_from_dict as run_phase4_from_dict
+        except ImportError as e:
+            raise Phase2Error(f"Failed to import phase3/phase4 runners: {e}") from e
 
-        # try:
-        #     from phase3 import run_with_json as run_phase3_with_json
-        # except Exception as e:
-        #     raise Phase2Error(f"Failed to import phase3 runner: {e}") from e
+        # Shallow copy without presentation_metadata; phase3/phase4 do not mutate nested request values
+        phase_3_input = {k: v for k, v in request.items() if k != "presentation_metadata"}
+
+        # Build and add worksheet_id
+        phase_3_input["worksheet_id"] = get_worksheet_id()
 
         try:
-            logger.debug("Entering run_phase3_with_json()")
-            phase_3_stdout_data = run_phase3_with_json(
-                json.dumps(phase_3_input, ensure_ascii=False)
-            )
-            logger.debug("Exiting run_phase3_with_json()")
+            logger.debug("Entering run_phase3_from_dict()")
+            phase_3_output = run_phase3_from_dict(phase_3_input)
+            logger.debug("Exiting run_phase3_from_dict()")
         except SystemExit as e:
             raise Phase2Error(str(e)) from e
         try:
-            logger.debug("Entering run_phase4_with_json()")
-            phase_4_stdout_data = run_phase4_with_json(phase_3_stdout_data)
-            logger.debug("Exiting run_phase4_with_json()")
-        except SystemExit as e:
-            logger.debug("Failed to run run_phase4_with_json() with error: %s", str(e))
+            logger.debug("Entering run_phase4_from_dict()")
+            phase_4_output = run_phase4_from_dict(phase_3_output)
+            logger.debug("Exiting run_phase4_from_dict()")
+        except (SystemExit, Phase4Error) as e:
+            logger.debug("Failed to run run_phase4_from_dict() with error: %s", str(e))
             raise Phase2Error(str(e)) from e
-        
-        # Write phase_4_stdout_data to cache_path, creating subdirectories as needed
-        cache_path.parent.mkdir(parents=True, exist_ok=True)
+
         logger.debug("Writing phase4 output to cache_path=%s", cache_path)
-        with cache_path.open("w", encoding="utf-8") as f:
-            f.write(phase_4_stdout_data)
+        _write_cache_payload(cache_path, json_io.dumps_bytes(phase_4_output))
+
+        try:
+            cache_stat = os.stat(cache_path)
+        except OSError as e:
+            raise Phase2Error(f"Failed to read/parse cache file: {e}") from e
 
     # Load payload from cache file
     try:
-        with cache_path.open("r", encoding="utf-8") as f:
-            output_payload = json.load(f)
+        output_payload = json_io.loads(
+            _read_payload_bytes(cache_path, cache_stat.st_mtime_ns, cache_stat.st_size)
+        )
     except (OSError, json.JSONDecodeError) as e:
         raise Phase2Error(f"Failed to read/parse cache file: {e}") from e
 
@@ -375,13 +497,15 @@ def process_request(request):
 
         # load dataset metadata for source, source_abbr
         dataset_entry = lookup_source_dataset(source_dataset)
-        dataset_title = (dataset_entry or {}).get("title", "")
-        dataset_abbr = (dataset_entry or {}).get("title_abbr", "")
+        dataset_title, dataset_abbr = (
+            (dataset_entry["title"], dataset_entry["title_abbr"]) if dataset_entry else ("", "")
+        )
 
         # load theme metadata for theme, theme_abbr
         theme_entry = lookup_theme(theme)
-        theme_title = (theme_entry or {}).get("title", "")
-        theme_abbr = (theme_entry or {}).get("title_abbr", "")
+        theme_title, theme_abbr = (
+            (theme_entry["title"], theme_entry["title_abbr"]) if theme_entry else ("", "")
+        )
 
         presentation_variables = {
             "section": section,
@@ -389,50 +513,53 @@ def process_request(request):
             "reading_level": reading_level["level"],
             "model": model,
             "episode": seed,
-            "worksheet_id": worksheet_id,
+            "worksheet_id": get_worksheet_id(),
             "source": dataset_title,
             "source_abbr": dataset_abbr,
             "theme": theme_title,
             "theme_abbr": theme_abbr,
         }
 
+        variables = {key: str(value) for key, value in presentation_variables.items()}
         interpolated_metadata = dict(request_metadata)
         for key in ("header", "footer", "answer_key_footer"):
-            if key in interpolated_metadata:
-                template = interpolated_metadata[key]
-                if template is None:
-                    continue
-                text = str(template)
-                for var_key, value in presentation_variables.items():
-                    placeholder = "{" + var_key + "}"
-                    text = text.replace(placeholder, str(value))
-                interpolated_metadata[key] = text
+            template = interpolated_metadata.get(key)
+            if template is not None:
+                interpolated_metadata[key] = interpolate_placeholders(str(template), variables)
 
         output_payload["presentation_metadata"] = interpolated_metadata
 
     # Build a worksheet_id for the next episode (seed+1) for use as the QR code target
-    SEED_BITS = 8
-    max_seed = (1 << SEED_BITS) - 1
     seed_int = int(seed)
-    if seed_int < max_seed:
-        next_request = dict(request)
-        next_request["seed"] = seed_int + 1
+    if seed_int < _SEED_MASK:
         try:
-            output_payload["qr_worksheet_id"] = build_worksheet_id(next_request)
+            output_payload["qr_worksheet_id"] = build_worksheet_id(
+                source_dataset,
+                theme,
+                reading_level,
+                model,
+                section,
+                seed_int + 1,
+                reference_data_dir,
+            )
         except SystemExit:
             pass
 
     return output_payload
 
 
+def run_from_dict(request: Dict[str, Any]) -> Dict[str, Any]:
+    return process_request(request)
+
+
 def run_from_json(request_json):
     try:
-        request = json.loads(request_json)
+        request = json_io.loads(request_json)
     except json.JSONDecodeError as e:
         raise Phase2Error(f"Failed to parse request JSON: {e}") from e
 
-    output_payload = process_request(request)
-    return json.dumps(output_payload, ensure_ascii=False, indent=2)
+    output_payload = run_from_dict(request)
+    return json_io.dumps(output_payload)
 
 
 def run_with_json(request_json):
@@ -444,7 +571,7 @@ def main(argv=None):
 
     # Read JSON request from stdin
     try:
-        request = json.load(sys.stdin)
+        request = json_io.loads(sys.stdin.buffer.read())
     except json.JSONDecodeError as e:
         print(f"Error: Failed to parse JSON from stdin: {e}", file=sys.stderr)
         sys.exit(1)
@@ -455,8 +582,7 @@ def main(argv=None):
         print(f"Error: {e}", file=sys.stderr)
         sys.exit(e.exit_code)
 
-    json.dump(output_payload, sys.stdout, ensure_ascii=False, indent=2)
-    sys.stdout.write("\n")
+    sys.stdout.buffer.write(json_io.dumps_bytes(output_payload, append_newline=True))
 
 
 if __name__ == "__main__":
@@ -2,9 +2,11 @@
 import argparse
 import hashlib
 import json
+import operator
 import sys
 
-from Libraries.datasets import load_dataset
+from Libraries import json_io
+from Libraries.datasets import load_section_index
 
 def parse_args():
     parser = argparse.ArgumentParser(
@@ -15,32 +17,54 @@ def parse_args():
 
 def load_request(stdin_data: str):
     try:
-        return json.loads(stdin_data)
+        return json_io.loads(stdin_data)
     except json.JSONDecodeError as exc:
         raise SystemExit(f"Failed to parse JSON from stdin: {exc}")
 
 
-def find_section(dataset: dict, section_number: int) -> dict:
-    sections = dataset.get("sections", [])
-    for section in sections:
-        if section.get("section") == section_number:
-            return section
-    raise SystemExit(f"Section {section_number} not found in dataset.")
+def find_section(section_index: dict, section_number: int) -> dict:
+    try:
+        return section_index[section_number]
+    except KeyError:
+        raise SystemExit(f"Section {section_number} not found in dataset.") from None
+
+
+_READING_LEVEL_FIELDS = operator.itemgetter("system", "level")
 
 
 def build_reading_level_token(reading_level: dict) -> str:
     # Expecting {"system": "...", "level": "..."}
     if not isinstance(reading_level, dict):
         raise SystemExit("reading_level must be an object with 'system' and 'level'.")
-    system = reading_level.get("system")
-    level = reading_level.get("level")
+    try:
+        system, level = _READING_LEVEL_FIELDS(reading_level)
+    except KeyError:
+        system = level = None
     if system is None or level is None:
         raise SystemExit("reading_level must contain 'system' and 'level' keys.")
     return f"{system}-{level}"
 
 
-def sha256_prefix_16(s: str) -> str:
-    return hashlib.sha256(s.encode("utf-8")).hexdigest()[:16]
+_sha256 = hashlib.sha256
+
+
+def sha256_prefix_16(s: str, _h=_sha256) -> str:
+    return _h(s.encode("utf-8")).hexdigest()[:16]
+
+
+def _data_item(doc_key: str, entry: dict) -> dict:
+    word = entry["word"]
+    part_of_speech = entry["part_of_speech"]
+    definition = entry["definition"]
+    key = f"{doc_key}|{word}|{part_of_speech}|{definition}"
+    return {
+        "word": word,
+        "part_of_speech": part_of_speech,
+        "definition": definition,
+        "def_num": entry.get("def_num"),
+        "key": key,
+        "checksum": sha256_prefix_16(key),
+    }
 
 
 def build_output(request: dict, section_entries: list) -> dict:
@@ -69,35 +93,8 @@ def build_output(request: dict, section_entries: list) -> dict:
     )
     doc_checksum = sha256_prefix_16(doc_key)
 
-    # Build data section
-    data_items = []
-    for entry in section_entries:
-        word = entry["word"]
-        part_of_speech = entry["part_of_speech"]
-        definition = entry["definition"]
-        def_num = entry.get("def_num")
-
-        # key = doc_key | word | part_of_speech | definition
-        key = "|".join(
-            [
-                doc_key,
-                word,
-                part_of_speech,
-                definition,
-            ]
-        )
-        checksum = sha256_prefix_16(key)
-
-        data_items.append(
-            {
-                "word": word,
-                "part_of_speech": part_of_speech,
-                "definition": definition,
-                "def_num": def_num,
-                "key": key,
-                "checksum": checksum,
-            }
-        )
+    # Build data section; each key = doc_key | word | part_of_speech | definition
+    data_items = [_data_item(doc_key, entry) for entry in section_entries]
 
     output = {
         "type": request.get("type", "build_request"),
@@ -125,33 +122,37 @@ def main():
     request = load_request(stdin_data)
 
     source_dataset = request["source_dataset"]
-    dataset = load_dataset(source_dataset)
+    section_index = load_section_index(source_dataset)
 
     # Determine section number from request (section)
     section_number = request.get("section")
     if section_number is None:
         raise SystemExit("Section number not found in request (section).")
 
-    section_obj = find_section(dataset, section_number)
+    section_obj = find_section(section_index, section_number)
     entries = section_obj.get("entries", [])
 
     output = build_output(request, entries)
-    json.dump(output, sys.stdout, ensure_ascii=False, indent=2)
+    sys.stdout.buffer.write(json_io.dumps_bytes(output))
 
 
-def run_from_json(request_json: str) -> str:
-    request = load_request(request_json)
+def run_from_dict(request: dict) -> dict:
     source_dataset = request["source_dataset"]
-    dataset = load_dataset(source_dataset)
+    section_index = load_section_index(source_dataset)
 
     section_number = request.get("section")
     if section_number is None:
         raise SystemExit("Section number not found in request (section).")
 
-    section_obj = find_section(dataset, int(section_number))
+    section_obj = find_section(section_index, int(section_number))
     entries = section_obj.get("entries", [])
-    output = build_output(request, entries)
-    return json.dumps(output, ensure_ascii=False, indent=2)
+    return build_output(request, entries)
+
+
+def run_from_json(request_json: str) -> str:
+    request = load_request(request_json)
+    output = run_from_dict(request)
+    return json_io.dumps(output)
 
 
 def run_with_json(request_json: str):
@@ -1,18 +1,77 @@
 #!/usr/bin/env python3
 import argparse
+import asyncio
+import atexit
 import json
 import os
 import logging
 from pydantic import BaseModel
 import sys
-from typing import Any, Dict, Optional
+import threading
+import time
+import weakref
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from flask import current_app, has_app_context
-from openai import OpenAI
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+
+try:
+    from Libraries import json_io
+except ImportError:
+    # Run as a standalone script without the repo root on sys.path: the same
+    # helpers on the stdlib json module
+    json_io = SimpleNamespace(
+        loads=json.loads,
+        dumps=lambda obj: json.dumps(obj, ensure_ascii=False, indent=2),
+        dumps_bytes=lambda obj, append_newline=False: (
+            json.dumps(obj, ensure_ascii=False, indent=2) + ("\n" if append_newline else "")
+        ).encode("utf-8"),
+        dumps_compact=lambda obj: json.dumps(obj, ensure_ascii=False, separators=(",", ":")),
+    )
 
 # Temperature setting for OpenAI API calls
 OPENAI_TEMPERATURE = 1.0
 
+# Attempts after the first for transient OpenAI failures (connection errors,
+# timeouts, 408/409/429 and 5xx). The SDK retries these itself with jittered
+# exponential backoff (0.5s doubling to 8s, honouring Retry-After); its default is 2.
+OPENAI_MAX_RETRIES = 5
+
+# Connection pool for the shared OpenAI clients. The ceiling matches the SDK
+# default and can be tuned with OPENAI_HTTPX_MAX_CONN; idle connections are
+# kept for 30s (SDK default 5s) so back-to-back requests skip the TLS handshake.
+OPENAI_MAX_CONNECTIONS = 1000
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = 100
+OPENAI_KEEPALIVE_EXPIRY = 30.0
+
+# Shared clients, created on first use so importing this module does not
+# require OPENAI_API_KEY. httpx async connection pools belong to the event loop
+# that opened them, so there is one AsyncOpenAI client per running loop.
+_client: Optional[OpenAI] = None
+_client_lock = threading.Lock()
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+# Default cap on in-flight OpenAI requests for batch runs
+DEFAULT_BATCH_CONCURRENCY = 10
+
+# Polling for OpenAI Batch API jobs: exponential backoff between these bounds (seconds)
+OPENAI_BATCH_POLL_INITIAL = 5.0
+OPENAI_BATCH_POLL_MAX = 300.0
+OPENAI_BATCH_TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+class Phase4Error(Exception):
+    """
+    Raised by library code for a request phase4 cannot process; main() turns it
+    into a CLI exit. Older paths still raise SystemExit (see AGENTS.md).
+    """
+
 
 def get_logger():
     if has_app_context():
@@ -24,16 +83,21 @@ def load_default_paths() -> Dict[str, Optional[str]]:
     """
     Load defaults from VOCAB_HUNTERS_DB_PATH via the reference_data library.
     """
-    if not os.environ.get("VOCAB_HUNTERS_DB_PATH"):
+    try:
+        from Libraries.reference_data import get_prompt_path, get_themes_dir
+    except ImportError:
+        # Standalone script run; CLI callers must pass paths explicitly
         return {"prompt_path": None, "themes_dir": None}
 
     try:
-        from Libraries.reference_data import get_prompt_path, get_themes_dir
         return {
             "prompt_path": str(get_prompt_path()),
             "themes_dir": str(get_themes_dir()),
         }
-    except (RuntimeError, ValueError) as exc:
+    except RuntimeError:
+        # VOCAB_HUNTERS_DB_PATH is not set; CLI callers must pass paths explicitly
+        return {"prompt_path": None, "themes_dir": None}
+    except ValueError as exc:
         raise SystemExit(str(exc)) from exc
 
 
@@ -56,6 +120,29 @@ def parse_args(
         required=default_prompt_path is None,
         help="Path to a text file containing the system prompt/instructions.",
     )
+    parser.add_argument(
+        "--batch",
+        metavar="JSONL",
+        help=(
+            "Process every phase_3-style request in this JSONL file (one per "
+            "line) concurrently instead of reading a single request from stdin. "
+            "Writes one output JSON per line, in input order; failures go to stderr."
+        ),
+    )
+    parser.add_argument(
+        "--openai-batch",
+        metavar="JSONL",
+        help=(
+            "Like --batch, but submit the requests through the OpenAI Batch API "
+            "(half price, completes within 24h) and wait for the results."
+        ),
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=DEFAULT_BATCH_CONCURRENCY,
+        help="Maximum number of OpenAI requests in flight during --batch.",
+    )
     parser.add_argument(
         "-t",
         "--themes-dir",
@@ -72,48 +159,96 @@ def parse_args(
 
 
 def read_stdin_json() -> Dict[str, Any]:
-    raw = sys.stdin.read()
+    raw = sys.stdin.buffer.read()
     try:
-        return json.loads(raw)
+        return json_io.loads(raw)
     except json.JSONDecodeError as exc:
         raise SystemExit(f"Failed to parse JSON from stdin: {exc}") from exc
 
 
-def read_request_json(request_json: str) -> Dict[str, Any]:
+def read_request_json(request_json: Union[str, bytes]) -> Dict[str, Any]:
     try:
-        return json.loads(request_json)
+        return json_io.loads(request_json)
     except json.JSONDecodeError as exc:
         raise SystemExit(f"Failed to parse JSON from request_json: {exc}") from exc
     
+def validate_request(request_json: Dict[str, Any]) -> None:
+    """
+    Check the fields append_response_json and the prompt rely on, so a
+    malformed request fails before paying for an OpenAI call.
+    """
+    doc_checksum = request_json.get("doc_checksum")
+    if not doc_checksum or not isinstance(doc_checksum, str):
+        raise Phase4Error("Input JSON missing 'doc_checksum'.")
+    data = request_json.get("data") or []
+    if not isinstance(data, list):
+        raise Phase4Error("Input JSON 'data' must be a list.")
+    for entry in data:
+        if not isinstance(entry, dict) or not entry.get("checksum"):
+            raise Phase4Error("Input entry missing 'checksum'.")
+    try:
+        build_reading_level_str(request_json)
+    except SystemExit as exc:
+        raise Phase4Error(str(exc)) from exc
+
+
 def build_reading_level_str(request_json: Dict[str, Any]) -> str:
-    reading_level = request_json.get("reading_level")
-    if reading_level:
-        system = reading_level.get("system")
-        level = reading_level.get("level")
+    reading_level = request_json.get("reading_level") or {}
+    system = reading_level.get("system")
+    level = reading_level.get("level")
     if (not system or not level):
         raise SystemExit("Input JSON missing 'reading_level'.")
-    if system == "fp":
-        return f"Fountas & Pinnell level {level}"
-    elif system == "grade":
-        if level == 1:
-            return "1st-grade reading level"
-        elif level == 2:
-            return "2nd-grade reading level"
+    return _reading_level_phrase(system, level)
+
+
+_ORDINAL_SUFFIXES = ("th", "st", "nd", "rd") + ("th",) * 6
+
+
+def _ordinal(n: int) -> str:
+    """1 -> "1st", 2 -> "2nd", 3 -> "3rd", 11 -> "11th", 21 -> "21st"."""
+    if 10 <= n % 100 <= 20:
+        return f"{n}th"
+    return f"{n}{_ORDINAL_SUFFIXES[n % 10]}"
+
+
+def _grade_phrase(level: Any) -> str:
+    try:
+        return f"{_ordinal(int(level))}-grade reading level"
+    except (TypeError, ValueError):
         return f"{level}th-grade reading level"
-    else:
+
+
+_READING_LEVEL_PHRASES = {
+    "fp": lambda level: f"Fountas & Pinnell level {level}",
+    "grade": _grade_phrase,
+}
+
+
+def _reading_level_phrase(system: str, level: Any) -> str:
+    phrase = _READING_LEVEL_PHRASES.get(system)
+    if phrase is None:
         raise SystemExit(f"Unsupported reading_level system: {system}")
-    
+    return phrase(level)
+
+@lru_cache(maxsize=64)
+def _read_file_text_cached(path: str, mtime_ns: int, size: int) -> str:
+    # mtime_ns and size only key the cache so an edited prompt/theme is re-read
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
 def read_file_text(path: str) -> str:
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            return f.read()
+        st = os.stat(path)
+        return _read_file_text_cached(path, st.st_mtime_ns, st.st_size)
     except OSError as exc:
         raise SystemExit(f"Failed to read file '{path}': {exc}") from exc
 
 def flesh_out_system_prompt(raw_system_prompt: str, request_json: Dict[str, Any]) -> str:
+    if "{reading_level}" not in raw_system_prompt:
+        return raw_system_prompt
     reading_level = build_reading_level_str(request_json)
-    system_prompt = raw_system_prompt.replace("{reading_level}", reading_level)
-    return system_prompt
+    return raw_system_prompt.replace("{reading_level}", reading_level)
 
 def load_theme_content(request: Dict[str, Any], theme_dir: Optional[str]) -> Optional[str]:
     """
@@ -140,17 +275,13 @@ def build_model_input(request: Dict[str, Any], theme_content: Optional[str]) ->
     This includes the original request JSON and, if present, the raw theme file
     contents. Your prompt file should tell the model how to interpret these.
     """
-    parts = []
-
     # The raw request JSON, so the model can see words/definitions/etc.
-    parts.append("REQUEST JSON:\n")
-    parts.append(json.dumps(request, ensure_ascii=False, indent=2))
-
-    if theme_content is not None:
-        parts.append("\n\nTHEME:\n")
-        parts.append(theme_content)
+    # Compact: indentation only adds billed input tokens
+    request_body = json_io.dumps_compact(request)
 
-    return "".join(parts)
+    if theme_content is None:
+        return f"REQUEST JSON:\n{request_body}"
+    return f"REQUEST JSON:\n{request_body}\n\nTHEME:\n{theme_content}"
 
 class VocabSentence(BaseModel):
     checksum: str
@@ -161,13 +292,13 @@ class JsonOutputFormat(BaseModel):
     doc_checksum: str
     data: list[VocabSentence]
 
-def call_openai(
+def build_openai_kwargs(
     request: Dict[str, Any],
     system_prompt: str,
     user_input: str,
-) -> JsonOutputFormat:
+) -> Dict[str, Any]:
     """
-    Call the OpenAI Responses API using:
+    Build the Responses API arguments using:
       - model from request['model']
       - system_prompt as `instructions`
       - user_input as `input`
@@ -176,14 +307,10 @@ def call_openai(
     if not model:
         raise SystemExit("Input JSON must contain a 'model' field.")
 
-    seed = request.get("seed")
-
-    logger = get_logger()
-    logger.debug("Calling OpenAI with model=%s seed=%s", model, seed)
-    client = OpenAI()  # expects OPENAI_API_KEY in env
+    get_logger().debug("Calling OpenAI with model=%s seed=%s", model, request.get("seed"))
 
     # The Responses API takes `instructions` (system-level) and `input` (user-level) :contentReference[oaicite:3]{index=3}
-    kwargs: Dict[str, Any] = {
+    return {
         "model": model,
         "instructions": system_prompt,
         "input": user_input,
@@ -192,21 +319,242 @@ def call_openai(
         "text_format": JsonOutputFormat,
         }
 
+
+def parsed_openai_output(response) -> JsonOutputFormat:
+    output = response.output_parsed
+
+    if output:
+        return output
+
+    response_text = getattr(response, "output_text", None)
+    get_logger().debug("OpenAI response parsing failed; raw_text=%s", response_text)
+    raise SystemExit("OpenAI response could not be parsed as JsonOutputFormat.")
+
+
+def call_openai(
+    request: Dict[str, Any],
+    system_prompt: str,
+    user_input: str,
+) -> JsonOutputFormat:
+    """
+    Call the OpenAI Responses API; see build_openai_kwargs for the arguments.
+    """
+    kwargs = build_openai_kwargs(request, system_prompt, user_input)
+    logger = get_logger()
+    client = get_client()
+
     try:
         logger.debug("Calling OpenAI")
         response = client.responses.parse(**kwargs)
     except Exception as exc:
         logger.debug("OpenAI API call failed: %s", exc, exc_info=True)
         raise SystemExit(f"OpenAI API call failed: {exc}") from exc
-    
-    output = response.output_parsed
-    
-    if output:
-        return output
 
-    response_text = getattr(response, "output_text", None)
-    logger.debug("OpenAI response parsing failed; raw_text=%s", response_text)
-    exit(1)
+    return parsed_openai_output(response)
+
+
+def openai_http_limits() -> httpx.Limits:
+    raw = os.environ.get("OPENAI_HTTPX_MAX_CONN")
+    try:
+        max_connections = int(raw) if raw else OPENAI_MAX_CONNECTIONS
+    except ValueError:
+        raise Phase4Error(f"OPENAI_HTTPX_MAX_CONN must be an integer, got {raw!r}.") from None
+    return httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=min(OPENAI_MAX_KEEPALIVE_CONNECTIONS, max_connections),
+        keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+    )
+
+
+def get_client() -> OpenAI:
+    """Return the process-wide OpenAI client, so requests reuse pooled connections."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                # expects OPENAI_API_KEY in env; DefaultHttpxClient keeps the SDK's timeouts
+                _client = OpenAI(
+                    max_retries=OPENAI_MAX_RETRIES,
+                    http_client=DefaultHttpxClient(limits=openai_http_limits()),
+                )
+                atexit.register(_client.close)
+    return _client
+
+
+def get_async_client() -> AsyncOpenAI:
+    """
+    Return the AsyncOpenAI client for the running event loop. A later asyncio.run()
+    gets a fresh client instead of one whose pool is tied to a closed loop; entries
+    drop out once their loop is garbage collected.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        with _client_lock:
+            client = _async_clients.get(loop)
+            if client is None:
+                # expects OPENAI_API_KEY in env; DefaultAsyncHttpxClient keeps the SDK's timeouts
+                client = AsyncOpenAI(
+                    max_retries=OPENAI_MAX_RETRIES,
+                    http_client=DefaultAsyncHttpxClient(limits=openai_http_limits()),
+                )
+                _async_clients[loop] = client
+    return client
+
+
+async def call_openai_async(
+    request: Dict[str, Any],
+    system_prompt: str,
+    user_input: str,
+) -> JsonOutputFormat:
+    """
+    Awaitable call_openai on the shared AsyncOpenAI client, so concurrent
+    requests overlap their network waits.
+    """
+    kwargs = build_openai_kwargs(request, system_prompt, user_input)
+    logger = get_logger()
+
+    try:
+        logger.debug("Calling OpenAI (async)")
+        response = await get_async_client().responses.parse(**kwargs)
+    except Exception as exc:
+        logger.debug("OpenAI API call failed: %s", exc, exc_info=True)
+        raise SystemExit(f"OpenAI API call failed: {exc}") from exc
+
+    return parsed_openai_output(response)
+
+def batch_text_format() -> Dict[str, Any]:
+    """
+    The Responses `text.format` parameter for JsonOutputFormat, as responses.parse()
+    sends it: a strict json_schema, which requires every object to be closed.
+    """
+    schema = JsonOutputFormat.model_json_schema()
+    for obj in (schema, *schema.get("$defs", {}).values()):
+        obj["additionalProperties"] = False
+    return {"type": "json_schema", "strict": True, "name": JsonOutputFormat.__name__, "schema": schema}
+
+
+def submit_batch(
+    request_jsons: List[str],
+    prompt_path: Optional[str] = None,
+    themes_dir: Optional[str] = None,
+) -> Tuple[Optional[str], List[Union[Dict[str, Any], Exception]]]:
+    """
+    Upload request JSON strings as an OpenAI Batch API job against /v1/responses.
+    Each line carries the same arguments call_openai would send; custom_id is the
+    request's index in the list.
+
+    Returns (batch_id, requests): requests has one entry per input, in order, the
+    parsed request dict or the Phase4Error that kept it out of the batch, like
+    run_batch_async. batch_id is None when no request was valid.
+    """
+    text_format = batch_text_format()
+    requests: List[Union[Dict[str, Any], Exception]] = []
+    lines = []
+    for idx, request_json in enumerate(request_jsons):
+        try:
+            request_obj = read_request_json(request_json)
+            system_prompt, model_input = prepare_model_call(request_obj, prompt_path, themes_dir)
+            body = build_openai_kwargs(request_obj, system_prompt, model_input)
+        except (SystemExit, Phase4Error) as exc:
+            requests.append(Phase4Error(str(exc)))
+            continue
+        del body["text_format"]
+        body["text"] = {"format": text_format}
+        requests.append(request_obj)
+        lines.append(
+            json.dumps(
+                {"custom_id": str(idx), "method": "POST", "url": "/v1/responses", "body": body},
+                ensure_ascii=False,
+            )
+        )
+    if not lines:
+        return None, requests
+
+    logger = get_logger()
+    client = get_client()
+    try:
+        batch_file = client.files.create(
+            file=("phase4_batch.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch",
+        )
+        batch = client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/responses",
+            completion_window="24h",
+        )
+    except Exception as exc:
+        logger.debug("OpenAI batch submission failed: %s", exc, exc_info=True)
+        raise Phase4Error(f"OpenAI batch submission failed: {exc}") from exc
+    logger.debug("Submitted OpenAI batch id=%s requests=%d", batch.id, len(lines))
+    return batch.id, requests
+
+
+def batch_output_text(body: Dict[str, Any]) -> str:
+    """Concatenate the output_text parts of a raw /v1/responses body."""
+    return "".join(
+        part.get("text", "")
+        for item in body.get("output") or []
+        if item.get("type") == "message"
+        for part in item.get("content") or []
+        if part.get("type") == "output_text"
+    )
+
+
+def await_batch(
+    batch_id: Optional[str],
+    requests: List[Union[Dict[str, Any], Exception]],
+) -> List[Union[Dict[str, Any], Exception]]:
+    """
+    Poll a batch from submit_batch until it finishes, then validate each
+    result with append_response_json. Takes submit_batch's return values and
+    returns one entry per request, in order: the output dict, or a Phase4Error
+    describing that request's failure.
+    """
+    if batch_id is None:
+        return list(requests)
+    logger = get_logger()
+    client = get_client()
+    delay = OPENAI_BATCH_POLL_INITIAL
+    while True:
+        try:
+            batch = client.batches.retrieve(batch_id)
+        except Exception as exc:
+            logger.debug("OpenAI batch poll failed: %s", exc, exc_info=True)
+            raise Phase4Error(f"OpenAI batch poll failed: {exc}") from exc
+        logger.debug("OpenAI batch id=%s status=%s", batch_id, batch.status)
+        if batch.status in OPENAI_BATCH_TERMINAL_STATUSES:
+            break
+        time.sleep(delay)
+        delay = min(delay * 2, OPENAI_BATCH_POLL_MAX)
+
+    if batch.status != "completed":
+        raise Phase4Error(f"OpenAI batch {batch_id} ended with status '{batch.status}'.")
+
+    results: List[Union[Dict[str, Any], Exception]] = [
+        request if isinstance(request, Exception) else Phase4Error("No result returned by the OpenAI batch.")
+        for request in requests
+    ]
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        for line in client.files.content(file_id).text.splitlines():
+            if not line.strip():
+                continue
+            record = json_io.loads(line)
+            idx = int(record["custom_id"])
+            response = record.get("response") or {}
+            if record.get("error") or response.get("status_code") != 200:
+                error = record.get("error") or (response.get("body") or {}).get("error")
+                results[idx] = Phase4Error(f"OpenAI batch request failed: {error}")
+                continue
+            try:
+                parsed = JsonOutputFormat.model_validate_json(batch_output_text(response["body"]))
+                results[idx] = append_response_json(requests[idx], parsed)
+            except (SystemExit, ValueError) as exc:
+                results[idx] = Phase4Error(str(exc))
+    return results
+
 
 def append_response_json(request_json: Dict[str, Any], response_json: JsonOutputFormat):
     req_doc_checksum = request_json.get("doc_checksum")
@@ -218,30 +566,35 @@ def append_response_json(request_json: Dict[str, Any], response_json: JsonOutput
             f"doc_checksum mismatch: input={req_doc_checksum} response={response_json.doc_checksum}"
         )
 
-    response_by_checksum: Dict[str, VocabSentence] = {}
-    for item in response_json.data:
-        if item.checksum in response_by_checksum:
-            raise SystemExit(f"Duplicate checksum in response: {item.checksum}")
-        response_by_checksum[item.checksum] = item
-
-    input_entries = request_json.get("data") or []
-    missing_checksums = []
-
-    for entry in input_entries:
+    # Index input entries by checksum (duplicates all receive the sentence)
+    input_by_checksum: Dict[str, List[Dict[str, Any]]] = {}
+    for entry in request_json.get("data") or []:
         checksum = entry.get("checksum")
         if not checksum:
             raise SystemExit("Input entry missing 'checksum'.")
+        input_by_checksum.setdefault(checksum, []).append(entry)
 
-        response_entry = response_by_checksum.get(checksum)
-        if response_entry is None:
-            missing_checksums.append(checksum)
-            continue
+    # One pass over the response: duplicates, unexpected checksums, and outputs
+    seen_checksums = set()
+    extra_checksums = []
+    for item in response_json.data:
+        if item.checksum in seen_checksums:
+            raise SystemExit(f"Duplicate checksum in response: {item.checksum}")
+        seen_checksums.add(item.checksum)
 
-        entry["output"] = {"sentence": response_entry.sentence}
+        entries = input_by_checksum.get(item.checksum)
+        if entries is None:
+            extra_checksums.append(item.checksum)
+            continue
+        for entry in entries:
+            entry["output"] = {"sentence": item.sentence}
 
-    extra_checksums = set(response_by_checksum.keys()) - {
-        entry.get("checksum") for entry in input_entries
-    }
+    missing_checksums = [
+        checksum
+        for checksum, entries in input_by_checksum.items()
+        if checksum not in seen_checksums
+        for _ in entries
+    ]
 
     if missing_checksums:
         raise SystemExit(
@@ -263,99 +616,209 @@ def main() -> None:
         default_themes_dir=defaults["themes_dir"],
     )
 
-    # 1. Read request JSON from stdin.
+    try:
+        if args.batch:
+            run_batch_cli(args)
+        elif args.openai_batch:
+            run_openai_batch_cli(args)
+        else:
+            run_single_cli(args)
+    except Phase4Error as exc:
+        raise SystemExit(str(exc)) from exc
+
+
+def run_single_cli(args: argparse.Namespace) -> None:
     request_json = read_stdin_json()
+    output_obj = run_from_dict(
+        request_json,
+        prompt_path=args.prompt_path,
+        themes_dir=args.themes_dir,
+    )
+    sys.stdout.buffer.write(json_io.dumps_bytes(output_obj, append_newline=True))
 
-    # 2. Read system prompt file.
-    if not os.path.exists(args.prompt_path):
-        print(f"Error: prompt file not found: {args.prompt_path}", file=sys.stderr)
-        sys.exit(1)
-    raw_system_prompt = read_file_text(args.prompt_path)
-    system_prompt = flesh_out_system_prompt(raw_system_prompt, request_json)
 
-    # 3. Optionally load theme content.
-    theme_content = load_theme_content(request_json, args.themes_dir)
-    
-    # 4. Build the user input string.
-    model_input = build_model_input(request_json, theme_content)
-    
-    # 5. Call OpenAI.
-    response_payload = call_openai(
-        request=request_json,
-        system_prompt=system_prompt,
-        user_input=model_input,
+def read_batch_file(path: str) -> List[Tuple[int, str]]:
+    """Return (line_number, line) for each non-blank line of a JSONL file."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return [(n, line) for n, line in enumerate(f, start=1) if line.strip()]
+    except OSError as exc:
+        raise SystemExit(f"Failed to read batch file '{path}': {exc}") from exc
+
+
+def write_batch_results(
+    path: str,
+    numbered: List[Tuple[int, str]],
+    results: List[Union[Dict[str, Any], Exception]],
+) -> None:
+    failures = 0
+    for (line_number, _), result in zip(numbered, results):
+        if isinstance(result, Exception):
+            failures += 1
+            print(f"{path}:{line_number}: {result}", file=sys.stderr)
+            continue
+        sys.stdout.write(json_io.dumps_compact(result))
+        sys.stdout.write("\n")
+
+    if failures:
+        raise SystemExit(f"{failures} of {len(results)} batch request(s) failed.")
+
+
+def run_batch_cli(args: argparse.Namespace) -> None:
+    numbered = read_batch_file(args.batch)
+    results = asyncio.run(
+        run_batch_async(
+            [line for _, line in numbered],
+            prompt_path=args.prompt_path,
+            themes_dir=args.themes_dir,
+            max_concurrency=args.max_concurrency,
+        )
     )
-    
-    # 7. Append response JSON
-    output_obj = append_response_json(request_json, response_payload)
+    write_batch_results(args.batch, numbered, results)
 
-    # 6. Emit final wrapper JSON to stdout.
-    # output_obj = {
-    #     "request": request_json,
-    #     "response": response_payload,
-    # }
 
-    json.dump(output_obj, sys.stdout, ensure_ascii=False, indent=2)
-    sys.stdout.write("\n")
+def run_openai_batch_cli(args: argparse.Namespace) -> None:
+    numbered = read_batch_file(args.openai_batch)
+    batch_id, requests = submit_batch(
+        [line for _, line in numbered],
+        prompt_path=args.prompt_path,
+        themes_dir=args.themes_dir,
+    )
+    if batch_id is not None:
+        print(f"Submitted OpenAI batch {batch_id}; waiting for results.", file=sys.stderr)
+    write_batch_results(args.openai_batch, numbered, await_batch(batch_id, requests))
 
 
-def run_from_json(
-    request_json: str,
+def prepare_model_call(
+    request_obj: Dict[str, Any],
     prompt_path: Optional[str] = None,
     themes_dir: Optional[str] = None,
     theme_content: Optional[str] = None,
-) -> str:
-    defaults = load_default_paths()
-    prompt_path = prompt_path or defaults["prompt_path"]
+) -> Tuple[str, str]:
+    """
+    Resolve the prompt and theme for request_obj and return
+    (system_prompt, model_input).
+    """
+    validate_request(request_obj)
+    if not prompt_path or themes_dir is None:
+        defaults = load_default_paths()
+        prompt_path = prompt_path or defaults["prompt_path"]
+        if themes_dir is None:
+            themes_dir = defaults["themes_dir"]
     if prompt_path is None:
-        raise SystemExit("prompt_path is required.")
-    if themes_dir is None:
-        themes_dir = defaults["themes_dir"]
+        raise Phase4Error("prompt_path is required.")
 
-    request_obj = read_request_json(request_json)
     if not os.path.exists(prompt_path):
-        print(f"Error: prompt file not found: {prompt_path}", file=sys.stderr)
-        sys.exit(1)
+        raise Phase4Error(f"prompt file not found: {prompt_path}")
     raw_system_prompt = read_file_text(prompt_path)
     system_prompt = flesh_out_system_prompt(raw_system_prompt, request_obj)
     if theme_content is None:
         theme_content = load_theme_content(request_obj, themes_dir)
-    model_input = build_model_input(request_obj, theme_content)
+    return system_prompt, build_model_input(request_obj, theme_content)
+
+
+def run_from_dict(
+    request_obj: Dict[str, Any],
+    prompt_path: Optional[str] = None,
+    themes_dir: Optional[str] = None,
+    theme_content: Optional[str] = None,
+) -> Dict[str, Any]:
+    system_prompt, model_input = prepare_model_call(
+        request_obj, prompt_path, themes_dir, theme_content
+    )
     response_payload = call_openai(
         request=request_obj,
         system_prompt=system_prompt,
         user_input=model_input,
     )
-    output_obj = append_response_json(request_obj, response_payload)
-    return json.dumps(output_obj, ensure_ascii=False, indent=2)
+    return append_response_json(request_obj, response_payload)
 
 
-def run_with_json(
+async def run_from_dict_async(
+    request_obj: Dict[str, Any],
+    prompt_path: Optional[str] = None,
+    themes_dir: Optional[str] = None,
+    theme_content: Optional[str] = None,
+) -> Dict[str, Any]:
+    system_prompt, model_input = prepare_model_call(
+        request_obj, prompt_path, themes_dir, theme_content
+    )
+    response_payload = await call_openai_async(
+        request=request_obj,
+        system_prompt=system_prompt,
+        user_input=model_input,
+    )
+    return append_response_json(request_obj, response_payload)
+
+
+def run_from_json(
     request_json: str,
     prompt_path: Optional[str] = None,
     themes_dir: Optional[str] = None,
     theme_content: Optional[str] = None,
 ) -> str:
-    return run_from_json(
-        request_json,
+    request_obj = read_request_json(request_json)
+    output_obj = run_from_dict(
+        request_obj,
         prompt_path=prompt_path,
         themes_dir=themes_dir,
         theme_content=theme_content,
     )
+    return json_io.dumps(output_obj)
 
 
-def run_phase4_with_json(
+async def run_from_json_async(
     request_json: str,
     prompt_path: Optional[str] = None,
     themes_dir: Optional[str] = None,
     theme_content: Optional[str] = None,
 ) -> str:
-    return run_from_json(
-        request_json,
+    request_obj = read_request_json(request_json)
+    output_obj = await run_from_dict_async(
+        request_obj,
         prompt_path=prompt_path,
         themes_dir=themes_dir,
         theme_content=theme_content,
     )
+    return json_io.dumps(output_obj)
+
+
+async def run_batch_async(
+    request_jsons: List[str],
+    prompt_path: Optional[str] = None,
+    themes_dir: Optional[str] = None,
+    max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+) -> List[Union[Dict[str, Any], Exception]]:
+    """
+    Run each request JSON string through run_from_dict_async concurrently,
+    with at most max_concurrency OpenAI calls in flight. Returns one entry per
+    input, in order: the output dict, or the exception (Phase4Error for
+    SystemExit-style failures) that request raised.
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1.")
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run_one(request_json: str) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                return await run_from_dict_async(
+                    read_request_json(request_json),
+                    prompt_path=prompt_path,
+                    themes_dir=themes_dir,
+                )
+            except SystemExit as exc:
+                # SystemExit would escape gather() and stop the event loop
+                raise Phase4Error(str(exc)) from exc
+
+    return await asyncio.gather(
+        *(run_one(request_json) for request_json in request_jsons),
+        return_exceptions=True,
+    )
+
+
+# The run_with_json name every phase script exposes
+run_with_json = run_from_json
 
 
 if __name__ == "__main__":
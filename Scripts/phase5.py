@@ -31,11 +31,15 @@ By default the look/feel matches your most recent Section 6 worksheet:
 """
 
 import argparse
+from bisect import bisect_right
 import json
 import os
 import random
+import re
 import sys
-from collections import Counter, defaultdict
+from typing import NamedTuple
+from functools import lru_cache
+from itertools import accumulate
 import hashlib
 import io
 
@@ -49,6 +53,14 @@ from reportlab.graphics.shapes import Drawing
 from reportlab.graphics import renderPDF
 from reportlab.lib.utils import ImageReader
 
+try:
+    from Libraries.json_io import loads as json_loads
+except ImportError:  # run as a standalone script without the repo root on sys.path
+    from json import loads as json_loads
+
+# Bump whenever rendered output changes; the Flask rendered-PDF cache keys on it
+PDF_RENDER_VERSION = 1
+
 # -----------------------------
 # Layout and style constants
 # -----------------------------
@@ -84,38 +96,115 @@ INSTRUCTIONS = (
 # -----------------------------
 # Utilities
 # -----------------------------
+class Question(NamedTuple):
+    """One worksheet question, with punctuation normalized and the blank filled in."""
+    word: str
+    definition: str
+    pos: str
+    sentence: str
+
+_SW_CACHE = {}
+_SW_CACHE_MAX = 65536  # the Flask app is long-lived; drop the memo rather than grow without bound
+
+def sw(text, font_name, font_size):
+    """stringWidth, memoized on (text, font, size)."""
+    key = (text, font_name, font_size)
+    width = _SW_CACHE.get(key)
+    if width is None:
+        if len(_SW_CACHE) >= _SW_CACHE_MAX:
+            _SW_CACHE.clear()
+        width = _SW_CACHE[key] = stringWidth(text, font_name, font_size)
+    return width
+
+_GLYPH_UNITS = {}  # font name -> {char: advance width in 1/1000 em}
+
+def _glyph_width_table(font_name):
+    table = _GLYPH_UNITS.get(font_name)
+    if table is None:
+        table = _GLYPH_UNITS[font_name] = {}
+    return table
+
+def warm_text_metrics():
+    """
+    Load the worksheet fonts and their printable-ASCII glyph widths up front,
+    so a long-lived caller (the Flask app) does not pay for it on the first render.
+    """
+    for font_name in {TITLE_FONT, SUBTITLE_FONT, TEXT_FONT, LABEL_FONT, WB_FONT}:
+        table = _glyph_width_table(font_name)
+        for code in range(32, 127):
+            ch = chr(code)
+            if ch not in table:
+                table[ch] = round(stringWidth(ch, font_name, 1000))
+
 def wrap_text(text, font_name, font_size, max_width):
-    """Simple word wrap based on stringWidth."""
-    words = text.split(" ")
-    lines, line = [], ""
-    for w in words:
-        trial = (line + " " + w).strip()
-        if stringWidth(trial, font_name, font_size) <= max_width:
-            line = trial
+    """
+    Simple greedy word wrap.
+    Line widths are kept as running sums of per-character glyph widths (the
+    standard Type 1 fonts used here have integer AFM widths), scaled the same
+    way stringWidth scales them, so breaks land exactly where re-measuring
+    each trial line would put them.
+    """
+    units = _glyph_width_table(font_name)
+    space_w = units.get(" ")
+    if space_w is None:
+        space_w = units[" "] = round(stringWidth(" ", font_name, 1000))
+
+    def measure(s):
+        total = 0
+        for ch in s:
+            ch_w = units.get(ch)
+            if ch_w is None:
+                ch_w = units[ch] = round(stringWidth(ch, font_name, 1000))
+            total += ch_w
+        return total
+
+    # Trial lines are measured stripped: line never has leading whitespace, a
+    # word's trailing whitespace ("\n", "\t") survives only mid-line, and
+    # emitted lines are stripped
+    lines, line, line_w = [], "", 0
+    for w in text.split(" "):
+        tail = w.rstrip()
+        if not line:
+            trial = tail.lstrip()
+            trial_w = measure(trial)
+        elif not tail:
+            trial = line.rstrip()
+            trial_w = line_w if len(trial) == len(line) else measure(trial)
+        else:
+            trial_w = line_w + space_w
+            for ch in tail:
+                ch_w = units.get(ch)
+                if ch_w is None:
+                    ch_w = units[ch] = round(stringWidth(ch, font_name, 1000))
+                trial_w += ch_w
+            trial = line + " " + tail
+        if trial_w * 0.001 * font_size <= max_width:
+            line, line_w = trial, trial_w
         else:
-            if line:
-                lines.append(line)
-            line = w
-    if line:
-        lines.append(line)
+            if line.rstrip():
+                lines.append(line.rstrip())
+            line = w.lstrip()
+            line_w = measure(line)
+    if line.rstrip():
+        lines.append(line.rstrip())
     return lines
 
+@lru_cache(maxsize=8192)
+def _wrap_text_cached(text, font_name, font_size, max_width):
+    """wrap_text memoized per process; returns a tuple of lines."""
+    return tuple(wrap_text(text, font_name, font_size, max_width))
+
+_ASCII_TRANS = str.maketrans({
+    "\u2018": "'", "\u2019": "'", "\u201c": '"', "\u201d": '"',
+    "\u2013": "-", "\u2014": "-", "\u2026": "...",
+    "\u2022": "-", "\u00b7": "-",
+})
+
 def normalize_ascii(s):
     """Ensure ASCII-safe punctuation (replace smart quotes/emdashes if present)."""
-    repl = {
-        "\u2018": "'", "\u2019": "'", "\u201c": '"', "\u201d": '"',
-        "\u2013": "-", "\u2014": "-", "\u2026": "...", "–": "-", "—": "-",
-        "’": "'", "“": '"', "”": '"',
-        "•": "-", "·": "-",
-    }
-    for k,v in repl.items():
-        s = s.replace(k, v)
-    return s
-
-def sentence_with_blank(s):
-    """Replace '###' with visible blank."""
-    return s.replace("###", BLANK)
+    return s if s.isascii() else s.translate(_ASCII_TRANS)
 
+@lru_cache(maxsize=4096)
 def guess_base_form(word):
     """
     Very small heuristic to group counts for the Word Bank.
@@ -135,35 +224,42 @@ def guess_base_form(word):
 def compute_word_counts(entries):
     """
     Build counts for the Word Bank using guessed base forms.
+    entries: Question tuples (anything with a .word).
     Returns: list of tuples [(display_word, count), ...] sorted by display_word.
     """
-    # Count by base
-    base_counts = Counter()
-    # Map base -> set of displayed forms (to choose a nice display label)
-    forms_for_base = defaultdict(Counter)
+    base_counts = {}
+    # (base, form) -> [uses, first position]; base -> best (base, form) key
+    form_stats = {}
+    best_form = {}
 
-    for e in entries:
-        form = e["word"]
+    for i, e in enumerate(entries):
+        form = e.word
         base = guess_base_form(form)
-        base_counts[base] += 1
-        forms_for_base[base][form] += 1
-
-    # Choose the most common displayed form as the label for each base
-    labeled = []
-    for base, cnt in base_counts.items():
-        common_form = forms_for_base[base].most_common(1)[0][0]
-        labeled.append((common_form, cnt))
+        base_counts[base] = base_counts.get(base, 0) + 1
+        key = (base, form)
+        stats = form_stats.get(key)
+        if stats is None:
+            stats = form_stats[key] = [0, i]
+        stats[0] += 1
+
+        # Label each base with its most common displayed form; ties go to the form seen first
+        best_key = best_form.get(base)
+        if best_key is None:
+            best_form[base] = key
+        elif best_key != key:
+            best = form_stats[best_key]
+            if stats[0] > best[0] or (stats[0] == best[0] and stats[1] < best[1]):
+                best_form[base] = key
+
+    labeled = [(best_form[base][1], cnt) for base, cnt in base_counts.items()]
 
     # Sort alphabetically by the label shown
     labeled.sort(key=lambda t: t[0].lower())
     return labeled
 
-def measure_block_height(wrapped_list, start_idx, end_idx):
-    """Compute the minimum height needed to draw lines from start_idx..end_idx with gaps."""
-    num_lines = sum(len(wrapped_list[i]) for i in range(start_idx, end_idx))
-    num_items = (end_idx - start_idx)
-    total_min_height = num_lines * LINE_HEIGHT + num_items * BASE_GAP_BETWEEN_PROBLEMS
-    return total_min_height
+def cumulative_block_heights(wrapped_list):
+    """Element i is the minimum height needed to draw questions 0..i with gaps."""
+    return list(accumulate(len(lines) * LINE_HEIGHT + BASE_GAP_BETWEEN_PROBLEMS for lines in wrapped_list))
 
 def draw_header_page(c, header_format, subtitle, page, total_pages):
 
@@ -173,18 +269,18 @@ def draw_header_page(c, header_format, subtitle, page, total_pages):
     c.setFont(TITLE_FONT, TITLE_SIZE)
     # t = header if not continued else f"{header} (page {page} of {total_pages})"
     #t = f"{header} (page {page} of {total_pages})"
-    c.drawString((PAGE_W - stringWidth(header, TITLE_FONT, TITLE_SIZE)) / 2, y, header)
+    c.drawString((PAGE_W - sw(header, TITLE_FONT, TITLE_SIZE)) / 2, y, header)
     y -= (TITLE_SIZE + 6)
 
     if subtitle:
         c.setFont(SUBTITLE_FONT, SUBTITLE_SIZE)
-        c.drawString((PAGE_W - stringWidth(subtitle, SUBTITLE_FONT, SUBTITLE_SIZE)) / 2, y, subtitle)
+        c.drawString((PAGE_W - sw(subtitle, SUBTITLE_FONT, SUBTITLE_SIZE)) / 2, y, subtitle)
         y -= (SUBTITLE_SIZE + 16)
 
     # Instructions on first page only
     if page == 1:
         c.setFont(TEXT_FONT, TEXT_SIZE)
-        for ln in wrap_text(INSTRUCTIONS, TEXT_FONT, TEXT_SIZE, CONTENT_W):
+        for ln in _wrap_text_cached(INSTRUCTIONS, TEXT_FONT, TEXT_SIZE, CONTENT_W):
             c.drawString(M_LEFT, y, ln)
             y -= LINE_HEIGHT
         y -= 8
@@ -219,8 +315,8 @@ def draw_word_bank(c, word_counts, y_start):
         w, cnt = item
         return f"{w} ({cnt})"
 
-    left_max_w = max((stringWidth(label_text(it), WB_FONT, WB_SIZE) for it in left_items), default=0)
-    right_max_w = max((stringWidth(label_text(it), WB_FONT, WB_SIZE) for it in right_items), default=0)
+    left_max_w = max((sw(label_text(it), WB_FONT, WB_SIZE) for it in left_items), default=0)
+    right_max_w = max((sw(label_text(it), WB_FONT, WB_SIZE) for it in right_items), default=0)
 
     requested_w = left_max_w + gap + right_max_w
     if requested_w <= inner_w:
@@ -240,11 +336,14 @@ def draw_word_bank(c, word_counts, y_start):
     c.rect(box_x, box_y_bottom, box_w, box_h, stroke=1, fill=0)
 
     yy = box_y_top - padding_tb - WB_SIZE
-    for i in range(rows):
-        if i < len(left_items):
-            c.drawString(col1_x, yy - i * row_h, label_text(left_items[i]))
-        if i < len(right_items):
-            c.drawString(col2_x, yy - i * row_h, label_text(right_items[i]))
+    for col_x, items in ((col1_x, left_items), (col2_x, right_items)):
+        if not items:
+            continue
+        t = c.beginText(col_x, yy)
+        t.setLeading(row_h)
+        for item in items:
+            t.textLine(label_text(item))
+        c.drawText(t)
 
     y = box_y_bottom - EXTRA_SPACE_BEFORE_FIRST_Q
     return y
@@ -256,22 +355,24 @@ def draw_questions(c, wrapped_questions, start_idx, end_idx, y_start, start_num=
     """
     y = y_start
     c.setFont(TEXT_FONT, TEXT_SIZE)
+    t = c.beginText(M_LEFT, y)
+    t.setLeading(LINE_HEIGHT)
     qnum = start_num
     for i in range(start_idx, end_idx):
         lines = wrapped_questions[i]
         if not lines:
-            c.drawString(M_LEFT, y, f"{qnum})")
+            t.textLine(f"{qnum})")
             y -= LINE_HEIGHT
         else:
             # put number in front of first line only
-            first = f"{qnum}) {lines[0]}"
-            c.drawString(M_LEFT, y, first)
-            y -= LINE_HEIGHT
+            t.textLine(f"{qnum}) {lines[0]}")
             for ln in lines[1:]:
-                c.drawString(M_LEFT, y, ln)
-                y -= LINE_HEIGHT
+                t.textLine(ln)
+            y -= LINE_HEIGHT * len(lines)
         qnum += 1
+        t.moveCursor(0, BASE_GAP_BETWEEN_PROBLEMS)
         y -= BASE_GAP_BETWEEN_PROBLEMS
+    c.drawText(t)
     return y, qnum
 
 def draw_questions_footer(c, footer_text):
@@ -282,7 +383,7 @@ def draw_questions_footer(c, footer_text):
     c.setFont(TEXT_FONT, TEXT_SIZE - 2)
 
     # center the footer text on the page
-    center_x = (PAGE_W - stringWidth(footer_text, TEXT_FONT, TEXT_SIZE - 2)) / 2
+    center_x = (PAGE_W - sw(footer_text, TEXT_FONT, TEXT_SIZE - 2)) / 2
     c.drawString(center_x, M_BOTTOM / 2, footer_text)
 
 def draw_answers_footer(c, footer_text, seed, qr_code):
@@ -314,21 +415,23 @@ def draw_answers_footer(c, footer_text, seed, qr_code):
         if seed is not None:
             episode_text = f"Get Episode {next_seed}"
             c.setFont(TEXT_FONT, TEXT_SIZE - 2)
-            ep_w = stringWidth(episode_text, TEXT_FONT, TEXT_SIZE - 2)
+            ep_w = sw(episode_text, TEXT_FONT, TEXT_SIZE - 2)
             ep_x = qr_x + max(0, (qr_w - ep_w) / 2)
             ep_y = qr_y - (TEXT_SIZE - 2) - 4
             c.drawString(ep_x, M_BOTTOM / 2, episode_text)
 
     # center the footer text on the page
-    center_x = (PAGE_W - stringWidth(footer_text, TEXT_FONT, TEXT_SIZE - 2)) / 2
+    center_x = (PAGE_W - sw(footer_text, TEXT_FONT, TEXT_SIZE - 2)) / 2
     c.drawString(center_x, M_BOTTOM / 2, footer_text)
 
+_PAGE_PLACEHOLDER_RE = re.compile(r"\{(current_page|total_pages)\}")
+
 def build_presentation_str(template, page, total_pages):
     """Interpolate page/total_pages into the template string."""
     if not template:
         return ""
-    formatted = template.replace("{current_page}", str(page)).replace("{total_pages}", str(total_pages))
-    return formatted
+    values = {"current_page": str(page), "total_pages": str(total_pages)}
+    return _PAGE_PLACEHOLDER_RE.sub(lambda m: values[m.group(1)], template)
 
 def _rng_seed_from_worksheet_id(worksheet_id):
     if worksheet_id is None:
@@ -353,22 +456,22 @@ def build_section(c, header_format, seed, worksheet_id, section, footer_format,
     rng = random.Random(rng_seed)
     shuffled_entries = rng.sample(entries, k=len(entries)) 
     
-    questions = []
-    for e in shuffled_entries:
-        word = normalize_ascii(e["word"])
-        definition = normalize_ascii(e["definition"])
-        pos = normalize_ascii(e["part_of_speech"])
-        sentence = normalize_ascii(e["output"]["sentence"])
-        sentence = sentence_with_blank(sentence)
-        questions.append({
-            "word": word, "definition": definition, "pos": pos, "sentence": sentence
-        })
+    # Normalize punctuation and swap '###' for the visible blank
+    questions = [
+        Question(
+            normalize_ascii(e["word"]),
+            normalize_ascii(e["definition"]),
+            normalize_ascii(e["part_of_speech"]),
+            normalize_ascii(e["output"]["sentence"]).replace("###", BLANK),
+        )
+        for e in shuffled_entries
+    ]
 
     # Word bank counts (try to group close forms like "rigged" -> "rig")
     word_counts = compute_word_counts(questions)
 
     # Wrap all questions
-    wrapped = [wrap_text(q["sentence"], TEXT_FONT, TEXT_SIZE, CONTENT_W) for q in questions]
+    wrapped = [_wrap_text_cached(q.sentence, TEXT_FONT, TEXT_SIZE, CONTENT_W) for q in questions]
 
     # ---------------- Page 1 ----------------
     y = draw_header_page(c, header_format, subtitle_with_episode, 1, 2)
@@ -376,13 +479,7 @@ def build_section(c, header_format, seed, worksheet_id, section, footer_format,
     available_h = y - M_BOTTOM
 
     # Find how many questions fit on page 1
-    end_idx_p1 = 0
-    for i in range(1, len(wrapped) + 1):
-        needed = measure_block_height(wrapped, 0, i)
-        if needed <= available_h:
-            end_idx_p1 = i
-        else:
-            break
+    end_idx_p1 = bisect_right(cumulative_block_heights(wrapped), available_h)
 
     _, next_num = draw_questions(c, wrapped, 0, end_idx_p1, y, start_num=1)
     draw_questions_footer(c, build_presentation_str(footer_format, 1, 2))
@@ -401,12 +498,12 @@ def build_section(c, header_format, seed, worksheet_id, section, footer_format,
     y3 = PAGE_H - M_TOP
     c.setFont(TITLE_FONT, TITLE_SIZE)
     ak_header = build_presentation_str(f"{header_format} (Answer Key)", 3, 2)
-    c.drawString((PAGE_W - stringWidth(ak_header, TITLE_FONT, TITLE_SIZE)) / 2, y3, ak_header)
+    c.drawString((PAGE_W - sw(ak_header, TITLE_FONT, TITLE_SIZE)) / 2, y3, ak_header)
     y3 -= (TITLE_SIZE + 6)
 
     if subtitle_with_episode:
         c.setFont(SUBTITLE_FONT, SUBTITLE_SIZE)
-        c.drawString((PAGE_W - stringWidth(subtitle_with_episode, SUBTITLE_FONT, SUBTITLE_SIZE)) / 2, y3, subtitle_with_episode)
+        c.drawString((PAGE_W - sw(subtitle_with_episode, SUBTITLE_FONT, SUBTITLE_SIZE)) / 2, y3, subtitle_with_episode)
         y3 -= (SUBTITLE_SIZE + 16)
 
     c.setFont(TEXT_FONT, TEXT_SIZE)
@@ -415,12 +512,12 @@ def build_section(c, header_format, seed, worksheet_id, section, footer_format,
 
     # Answers in the same order as questions
     # compute fixed column for definitions so they all start at the same offset
-    label_widths = []
-    for i, q in enumerate(questions, start=1):
-        w_num = stringWidth(f"{i}) ", TEXT_FONT, TEXT_SIZE)
-        w_word = stringWidth(q['word'], TITLE_FONT, TEXT_SIZE)
-        label_widths.append(w_num + w_word)
-    max_label_w = max(label_widths) if label_widths else 0
+    num_texts = [f"{i}) " for i in range(1, len(questions) + 1)]
+    num_widths = [sw(num_text, TEXT_FONT, TEXT_SIZE) for num_text in num_texts]
+    max_label_w = max(
+        (w_num + sw(q.word, TITLE_FONT, TEXT_SIZE) for w_num, q in zip(num_widths, questions)),
+        default=0,
+    )
 
     # slightly wider gap and smaller font for definitions
     padding_between = 18
@@ -428,30 +525,58 @@ def build_section(c, header_format, seed, worksheet_id, section, footer_format,
     def_font = TEXT_FONT
     def_size = max(8, TEXT_SIZE - 2)
 
-    for i, q in enumerate(questions, start=1):
+    t = c.beginText()
+    for num_text, w_num, q in zip(num_texts, num_widths, questions):
         # number
-        num_text = f"{i}) "
-        c.setFont(TEXT_FONT, TEXT_SIZE)
-        c.drawString(M_LEFT, y3, num_text)
+        t.setTextOrigin(M_LEFT, y3)
+        t.setFont(TEXT_FONT, TEXT_SIZE)
+        t.textOut(num_text)
 
         # bold word
-        x_word = M_LEFT + stringWidth(num_text, TEXT_FONT, TEXT_SIZE)
-        c.setFont(TITLE_FONT, TEXT_SIZE)  # bold
-        c.drawString(x_word, y3, q['word'])
+        t.setTextOrigin(M_LEFT + w_num, y3)
+        t.setFont(TITLE_FONT, TEXT_SIZE)  # bold
+        t.textOut(q.word)
 
         # definition (smaller font) aligned to fixed x_def
-        c.setFont(SUBTITLE_FONT, def_size)
-        def_text = f"  {q['definition']} ({q['pos']})"
-        c.drawString(x_def, y3, def_text)
+        t.setTextOrigin(x_def, y3)
+        t.setFont(SUBTITLE_FONT, def_size)
+        t.textOut(f"  {q.definition} ({q.pos})")
 
         y3 -= (TEXT_SIZE + 6)
+    c.drawText(t)
     
     draw_answers_footer(c, build_presentation_str(answer_key_footer_format, 3, 2), seed, qr_code)
     c.showPage()
 
     
-def build_pdf(doc_root, output_stream):
-    c = canvas.Canvas(output_stream, pagesize=letter)
+@lru_cache(maxsize=256)
+def _qr_drawing(url):
+    """
+    QR code Drawing for url; cached because the same episode is rendered repeatedly.
+    The widget is flattened to its Group of rects up front: QrCodeWidget.draw()
+    re-runs the QR encoder every time it is rendered.
+    """
+    qr_shapes = QrCodeWidget(url).draw()
+    b = qr_shapes.getBounds()
+    w = b[2] - b[0]
+    h = b[3] - b[1]
+    d = Drawing(w, h)
+    d.add(qr_shapes)
+    return d
+
+def build_pdf(doc_root, output_stream=None):
+    """
+    Render doc_root into output_stream. With no stream, render into memory and
+    return the PDF bytes.
+    """
+    buffer = io.BytesIO() if output_stream is None else None
+    # invariant=1 pins the creation date and document ID so the same worksheet renders to identical bytes
+    c = canvas.Canvas(
+        buffer if buffer is not None else output_stream,
+        pagesize=letter,
+        pageCompression=1,
+        invariant=1,
+    )
         
     worksheet_id = doc_root.get('worksheet_id')
     qr_worksheet_id = doc_root.get('qr_worksheet_id') or worksheet_id
@@ -459,14 +584,7 @@ def build_pdf(doc_root, output_stream):
     # Generate QR code image pointing to the next episode
     if qr_worksheet_id is not None:
         try:
-            base_url = f"http://vocabhunters.com/worksheet?id={qr_worksheet_id}"
-            qr_widget = QrCodeWidget(base_url)
-            b = qr_widget.getBounds()
-            w = b[2] - b[0]
-            h = b[3] - b[1]
-            d = Drawing(w, h)
-            d.add(qr_widget)
-            qr_code = d
+            qr_code = _qr_drawing(f"http://vocabhunters.com/worksheet?id={qr_worksheet_id}")
         except Exception:
             qr_code = None
     else:
@@ -480,6 +598,8 @@ def build_pdf(doc_root, output_stream):
     build_section(c, header_format, seed, worksheet_id, doc_root, footer_format, answer_key_footer_format, qr_code)
 
     c.save()
+    if buffer is not None:
+        return buffer.getvalue()
     
     # # Basic schema check
     # required = {"word", "definition", "part_of_speech", "sentence"}
@@ -497,7 +617,7 @@ def main():
 
     # Read JSON from stdin
     try:
-        doc_root = json.load(sys.stdin)
+        doc_root = json_loads(sys.stdin.buffer.read())
     except json.JSONDecodeError as e:
         print(f"Error: invalid JSON from stdin: {e}", file=sys.stderr)
         sys.exit(1)
@@ -518,16 +638,14 @@ def main():
 def run_from_json(doc_root):
     if isinstance(doc_root, str):
         try:
-            doc_root = json.loads(doc_root)
+            doc_root = json_loads(doc_root)
         except json.JSONDecodeError as e:
             raise ValueError(f"invalid JSON string: {e}") from e
 
     if not isinstance(doc_root, dict) or not doc_root:
         raise ValueError("JSON must be a non-empty dictionary.")
 
-    buffer = io.BytesIO()
-    build_pdf(doc_root, buffer)
-    return buffer.getvalue()
+    return build_pdf(doc_root)
 
 
 def run_with_json(doc_root):
@@ -1,14 +1,21 @@
 
+import hashlib
+import io
 import json
 import logging
+import multiprocessing
+import os
 import re
 import sys
+import threading
 import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timezone
 from functools import lru_cache
 from pathlib import Path
 
-from flask import Flask, render_template, request, jsonify, Response, redirect, url_for
+from flask import Flask, render_template, request, jsonify, Response, redirect, url_for, send_file
 
 app = Flask(__name__)
 logging.basicConfig(level=logging.DEBUG)
@@ -18,10 +25,19 @@ scripts_dir = Path(__file__).resolve().parent / "Scripts"
 if str(scripts_dir) not in sys.path:
     sys.path.append(str(scripts_dir))
 
-from phase2 import run_with_json, Phase2Error, decode_worksheet_id, build_worksheet_id
-from phase3 import run_with_json as run_phase3_with_json
-from phase4 import run_phase4_with_json
-from phase5 import run_with_json as run_phase5_with_json
+from phase2 import (
+    run_from_dict as run_phase2_from_dict,
+    Phase2Error,
+    decode_worksheet_id,
+    build_worksheet_id,
+    cache_dir_for,
+    cache_path_for,
+    interpolate_placeholders,
+)
+from phase3 import run_from_dict as run_phase3_from_dict
+from phase4 import Phase4Error, run_from_dict as run_phase4_from_dict
+from phase5 import PDF_RENDER_VERSION, run_with_json as run_phase5_with_json, warm_text_metrics
+from Libraries import json_io
 from Libraries.reference_data import (
     get_reference_data_path,
     get_source_datasets_dir,
@@ -32,9 +48,9 @@ from Libraries.reference_data import (
     lookup_source_dataset,
 )
 
-def build_reading_level_segment(reading_level):
-    # assume F&P
-    return f"fp_{reading_level}"
+warm_text_metrics()
+
+_FILENAME_SANITIZE_TABLE = str.maketrans({" ": "_", "/": "-"})
 
 def build_pdf_filename(source_dataset, theme, section, episode):
     """Build a descriptive PDF filename from worksheet parameters.
@@ -42,25 +58,18 @@ def build_pdf_filename(source_dataset, theme, section, episode):
     Uses title_abbr from reference data when available, falling back to key_name.
     Format: {source_abbr}-{theme_abbr}-S{section}-E{episode}.pdf
     """
-    app_config = get_app_config()
+    static_config = get_static_config()
+    ds = static_config["data_sources_by_id"].get(source_dataset)
+    source_abbr = (ds.get("title_abbr") or ds.get("key_name") or source_dataset) if ds else source_dataset
 
-    source_abbr = source_dataset
-    for ds in app_config["data_sources"]:
-        if ds["id"] == source_dataset:
-            source_abbr = ds.get("title_abbr") or ds.get("key_name") or source_dataset
-            break
-
-    theme_abbr = theme
-    for t in app_config["themes"]:
-        if t["id"] == theme:
-            theme_abbr = t.get("title_abbr") or t.get("key_name") or theme
-            break
+    t = static_config["themes_by_id"].get(theme)
+    theme_abbr = (t.get("title_abbr") or t.get("key_name") or theme) if t else theme
 
     # Sanitize: replace spaces with underscores, remove problematic chars
-    def sanitize(s):
-        return s.replace(" ", "_").replace("/", "-")
-
-    return f"{sanitize(source_abbr)}-{sanitize(theme_abbr)}-S{section}-E{episode}.pdf"
+    return (
+        f"{source_abbr.translate(_FILENAME_SANITIZE_TABLE)}-"
+        f"{theme_abbr.translate(_FILENAME_SANITIZE_TABLE)}-S{section}-E{episode}.pdf"
+    )
 
 def _sanitize_theme_name(text: str) -> str:
     sanitized = re.sub(r'\s+', '_', text.strip())
@@ -74,16 +83,16 @@ def record_user_theme_episode(custom_text: str):
     user_themes_dir.mkdir(parents=True, exist_ok=True)
     theme_path = user_themes_dir / f"{file_stem}.txt"
     timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
-    with theme_path.open("a", encoding="utf-8") as f:
+    with open(theme_path, "a+", encoding="utf-8") as f:
         f.write(timestamp + "\n")
-    episode_count = sum(1 for line in theme_path.read_text(encoding="utf-8").splitlines() if line.strip())
+        f.seek(0)
+        episode_count = sum(1 for line in f if line.strip())
     theme_content = "The sentences should take place in a world where " + file_stem.replace("_", " ")
     return file_stem, episode_count, theme_content
 
 
 def send_ntfy_notification(theme_name: str, episode: int):
-    import os as _os
-    topic = _os.environ.get("NTFY_TOPIC")
+    topic = os.environ.get("NTFY_TOPIC")
     if not topic:
         app.logger.warning("NTFY_TOPIC not set, skipping notification")
         return
@@ -99,49 +108,215 @@ def send_ntfy_notification(theme_name: str, episode: int):
     except Exception as exc:
         app.logger.warning("Failed to send ntfy notification: %s", exc)
 
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+def _get_pdf_pool():
+    """
+    Process pool for phase5 renders, or None to render on the request thread.
+
+    Opt in with PDF_RENDER_PROCESSES=N when serving from threads (flask run, gthread
+    workers), where concurrent renders otherwise queue on the GIL. Sync gunicorn
+    workers already render one PDF per process and should leave it unset.
+    """
+    global _pdf_pool
+    if _pdf_pool is None:
+        try:
+            workers = int(os.environ.get("PDF_RENDER_PROCESSES") or 0)
+        except ValueError:
+            app.logger.warning("Ignoring non-integer PDF_RENDER_PROCESSES")
+            workers = 0
+        if workers <= 0:
+            return None
+        with _pdf_pool_lock:
+            if _pdf_pool is None:
+                # spawn, not fork: the request threads may hold locks at fork time
+                _pdf_pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _pdf_pool
+
+def render_pdf(doc_root):
+    """Run phase5 on the phase4-shaped doc_root dict, in the PDF process pool when one is configured."""
+    pool = _get_pdf_pool()
+    if pool is None:
+        return run_phase5_with_json(doc_root)
+    try:
+        return pool.submit(run_phase5_with_json, doc_root).result()
+    except BrokenProcessPool as exc:
+        # A child died (OOM, crash); drop the pool so the next render starts a fresh one
+        app.logger.warning("PDF render pool broke, rendering in-process: %s", exc)
+        _discard_pdf_pool(pool)
+        return run_phase5_with_json(doc_root)
+
+def _discard_pdf_pool(pool):
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is pool:
+            _pdf_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def send_pdf(pdf_bytes, filename, etag=None):
+    """Inline PDF response with Content-Length and Range support for the browser viewer."""
+    resp = send_file(
+        io.BytesIO(pdf_bytes),
+        mimetype="application/pdf",
+        download_name=filename,
+        as_attachment=False,
+        conditional=True,
+        etag=etag or False,
+    )
+    if etag:
+        resp.headers["Cache-Control"] = "private, max-age=0, must-revalidate"
+    return resp
+
+WORKSHEET_PDF_METADATA = {
+    "header": "{theme} - Section {section}",
+    "footer": "Page {current_page} of {total_pages}",
+    "answer_key_footer": "Fountas & Pinnell Level {reading_level}",
+}
+_WORKSHEET_PDF_RENDER_KEY = "|".join(
+    [str(PDF_RENDER_VERSION), *(WORKSHEET_PDF_METADATA[k] for k in sorted(WORKSHEET_PDF_METADATA))]
+)
+
+def worksheet_pdf_etag(worksheet_id, decoded):
+    """
+    ETag for the /worksheet_pdf output of a decoded worksheet id, or None if its episode
+    has not been generated yet. The output is a function of the episode file, the
+    metadata templates and the phase5 render version, so the etag covers all three and
+    also keys the rendered-PDF cache. There is deliberately no Last-Modified: the episode
+    mtime alone would let If-Modified-Since revalidate output from an older render.
+    """
+    try:
+        st = os.stat(cache_path_for(decoded))
+    except OSError:
+        return None
+    key = f"{worksheet_id}|{st.st_mtime_ns}|{st.st_size}|{_WORKSHEET_PDF_RENDER_KEY}".encode("utf-8")
+    return hashlib.blake2b(key, digest_size=16).hexdigest()
+
+PDF_CACHE_DIRNAME = ".pdf_cache"
+PDF_CACHE_MAX_FILES = 1024
+
+def _pdf_cache_dir():
+    return os.path.join(str(get_responses_datastore_path()), PDF_CACHE_DIRNAME)
+
+def load_cached_pdf(cache_key):
+    """
+    Rendered PDF bytes for cache_key, or None on a miss or unreadable entry. A hit
+    bumps the file's mtime, which _evict_pdf_cache orders by.
+    """
+    cache_path = os.path.join(_pdf_cache_dir(), f"{cache_key}.pdf")
+    try:
+        with open(cache_path, "rb") as f:
+            pdf_bytes = f.read()
+    except FileNotFoundError:
+        return None
+    except OSError as exc:
+        app.logger.warning("Failed to read cached PDF %s: %s", cache_key, exc)
+        return None
+    try:
+        os.utime(cache_path)
+    except OSError:
+        pass
+    return pdf_bytes
+
+def store_cached_pdf(cache_key, pdf_bytes):
+    """
+    Write pdf_bytes under cache_key via temp file + os.replace, then trim the cache to
+    the PDF_CACHE_MAX_FILES most recently used. Best effort: failures are logged, not raised.
+    """
+    cache_dir = _pdf_cache_dir()
+    cache_path = os.path.join(cache_dir, f"{cache_key}.pdf")
+    tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.write(pdf_bytes)
+        os.replace(tmp_path, cache_path)
+        _evict_pdf_cache(cache_dir)
+    except OSError as exc:
+        app.logger.warning("Failed to cache PDF %s: %s", cache_key, exc)
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+
+def _evict_pdf_cache(cache_dir):
+    with os.scandir(cache_dir) as entries:
+        cached = [entry for entry in entries if entry.name.endswith(".pdf")]
+    if len(cached) <= PDF_CACHE_MAX_FILES:
+        return
+    # mtime, not atime: noatime/relatime mounts barely move atime, and hits touch mtime
+    cached.sort(key=lambda entry: entry.stat().st_mtime_ns)
+    for entry in cached[: len(cached) - PDF_CACHE_MAX_FILES]:
+        try:
+            os.unlink(entry.path)
+        except FileNotFoundError:
+            pass
+
 def build_worksheet_id_from_params(source_dataset, theme, model, reading_level, section, seed):
-    request_dict = {
-        "source_dataset": source_dataset,
-        "theme": theme,
-        "model": model,
-        "reading_level": {"system": "fp", "level": reading_level},
-        "section": section,
-        "seed": seed,
-    }
+    """
+    Worksheet id for an F&P request, or None if it cannot be encoded. Not memoized here:
+    phase2 already caches the encoding per reference-file stamp, so edits to themes,
+    models or datasets take effect without a restart.
+    """
     try:
-        return build_worksheet_id(request_dict)
+        return build_worksheet_id(
+            source_dataset=source_dataset,
+            theme=theme,
+            reading_level={"system": "fp", "level": reading_level},
+            model=model,
+            section=section,
+            seed=seed,
+        )
     except (SystemExit, Exception):
         return None
 
+@lru_cache(maxsize=4096)
+def _load_episode_subtitle(path_str, mtime_ns, size):
+    """Subtitle of a cached episode file; mtime_ns and size key the cache so a rewritten file is re-read."""
+    try:
+        with open(path_str, "rb") as f:
+            payload = json_io.loads(f.read())
+        return (
+            (payload.get("output") or {}).get("subtitle")
+            or (payload.get("presentation_metadata") or {}).get("subtitle")
+            or ""
+        )
+    except (OSError, json.JSONDecodeError):
+        return ""
+
 def list_cached_episodes(source_dataset, theme, reading_level, model, section):
-    datastore_root = get_responses_datastore_path()
-    reading_level_segment = build_reading_level_segment(reading_level)
-    cache_dir = (
-        datastore_root
-        / str(source_dataset)
-        / reading_level_segment
-        / str(section)
-        / str(theme)
-        / str(model)
-    )
+    # assume F&P
+    cache_dir = cache_dir_for({
+        "source_dataset": source_dataset,
+        "reading_level": {"system": "fp", "level": reading_level},
+        "section": section,
+        "theme": theme,
+        "model": model,
+    })
 
-    if not cache_dir.is_dir():
+    try:
+        # DirEntry.is_file() is answered from the readdir result, no per-file stat
+        entries = os.scandir(cache_dir)
+    except (FileNotFoundError, NotADirectoryError):
         return []
     episodes = []
-    for path in cache_dir.iterdir():
-        if path.is_file() and path.suffix == ".json" and path.stem.isdigit():
-            subtitle = ""
+    with entries:
+        for entry in entries:
+            name = entry.name
+            if not (name.endswith(".json") and name[:-5].isdigit()):
+                continue
+            if not entry.is_file():
+                continue
             try:
-                with path.open("r", encoding="utf-8") as f:
-                    payload = json.load(f)
-                subtitle = (
-                    (payload.get("output") or {}).get("subtitle")
-                    or (payload.get("presentation_metadata") or {}).get("subtitle")
-                    or ""
-                )
-            except (OSError, json.JSONDecodeError):
+                st = entry.stat()
+            except OSError:
                 subtitle = ""
-            episodes.append({"episode": int(path.stem), "subtitle": subtitle})
+            else:
+                subtitle = _load_episode_subtitle(entry.path, st.st_mtime_ns, st.st_size)
+            episodes.append({"episode": int(name[:-5]), "subtitle": subtitle})
     return sorted(episodes, key=lambda item: item["episode"])
 
 def load_models():
@@ -186,18 +361,55 @@ def load_sections_for_dataset(source_dataset):
         return sorted({int(s) for s in section_numbers if str(s).isdigit()})
     return list(range(1, len(sections) + 1))
 
+def _index_by_id(items):
+    """Map item["id"] -> item; the first item wins on duplicate ids, as the old linear scans did."""
+    index = {}
+    for item in items:
+        index.setdefault(item["id"], item)
+    return index
+
+_static_config = None
+_static_config_lock = threading.Lock()
+
+def get_static_config():
+    """
+    Reference lists and their id -> entry indexes, loaded once per worker. The lock
+    keeps concurrent cold-start requests from all re-reading the reference files.
+    """
+    global _static_config
+    if _static_config is None:
+        with _static_config_lock:
+            if _static_config is None:
+                data_sources = load_source_datasets()
+                themes = load_themes()
+                _static_config = {
+                    "data_sources": data_sources,
+                    "themes": themes,
+                    "models": load_models(),
+                    "levels": list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"),  # Generates ['A', 'B', ... 'Z']
+                    "data_sources_by_id": _index_by_id(data_sources),
+                    "themes_by_id": _index_by_id(themes),
+                }
+    return _static_config
+
+@lru_cache(maxsize=1)
+def get_default_sections():
+    data_sources = get_static_config()["data_sources"]
+    return load_sections_for_dataset(data_sources[0]["id"]) if data_sources else []
+
 @lru_cache(maxsize=1)
 def get_app_config():
-    data_sources = load_source_datasets()
-    default_sections = (
-        load_sections_for_dataset(data_sources[0]["id"]) if data_sources else []
-    )
+    """
+    Config for the templates, which serialize it into the page; the by-id indexes
+    are left out. PDF routes should use get_static_config() instead.
+    """
+    static_config = get_static_config()
     return {
-        "data_sources": data_sources,
-        "themes": load_themes(),
-        "models": load_models(),
-        "sections": default_sections,
-        "levels": list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"),  # Generates ['A', 'B', ... 'Z']
+        "data_sources": static_config["data_sources"],
+        "themes": static_config["themes"],
+        "models": static_config["models"],
+        "sections": get_default_sections(),
+        "levels": static_config["levels"],
     }
 
 @app.route('/')
@@ -279,14 +491,10 @@ def worksheet():
                 next_generate_episode = last_episode + 1
 
     # Resolve theme entry for CSS class
-    app_config = get_app_config()
-    theme_entry = None
-    for t in app_config["themes"]:
-        if t["id"] == params["theme"]:
-            theme_entry = t
-            break
-    if not theme_entry and app_config["themes"]:
-        theme_entry = app_config["themes"][0]
+    static_config = get_static_config()
+    theme_entry = static_config["themes_by_id"].get(params["theme"])
+    if not theme_entry and static_config["themes"]:
+        theme_entry = static_config["themes"][0]
 
     pdf_filename = build_pdf_filename(
         source_dataset=params["source_dataset"],
@@ -308,7 +516,7 @@ def worksheet():
         "theme_entry": theme_entry,
     }
 
-    return render_template('viewer.html', viewer=viewer, config=app_config)
+    return render_template('viewer.html', viewer=viewer, config=get_app_config())
 
 @app.route('/worksheet_pdf')
 def worksheet_pdf():
@@ -321,6 +529,23 @@ def worksheet_pdf():
     except Phase2Error as exc:
         return jsonify({"error": str(exc)}), 400
 
+    etag = worksheet_pdf_etag(worksheet_id, decoded)
+    if etag and request.if_none_match.contains_weak(etag):
+        resp = Response(status=304)
+        resp.set_etag(etag)
+        return resp
+
+    filename = build_pdf_filename(
+        source_dataset=decoded["source_dataset"],
+        theme=decoded["theme"],
+        section=decoded["section"],
+        episode=decoded["seed"],
+    )
+    if etag:
+        pdf_bytes = load_cached_pdf(etag)
+        if pdf_bytes is not None:
+            return send_pdf(pdf_bytes, filename, etag=etag)
+
     reading_level = decoded["reading_level"]
     payload = {
         "source_dataset": decoded["source_dataset"],
@@ -330,32 +555,24 @@ def worksheet_pdf():
         "section": decoded["section"],
         "seed": decoded["seed"],
         "episode": decoded["seed"],
-        "presentation_metadata": {
-            "header": "{theme} - Section {section}",
-            "footer": "Page {current_page} of {total_pages}",
-            "answer_key_footer": "Fountas & Pinnell Level {reading_level}",
-        },
+        "presentation_metadata": dict(WORKSHEET_PDF_METADATA),
     }
 
     try:
-        response_json = run_with_json(json.dumps(payload, ensure_ascii=False))
+        response_payload = run_phase2_from_dict(payload)
     except Phase2Error as exc:
         return jsonify({"error": str(exc)}), 400
 
     try:
-        pdf_bytes = run_phase5_with_json(response_json)
+        pdf_bytes = render_pdf(response_payload)
     except ValueError as exc:
         return jsonify({"error": f"Failed to build PDF: {exc}"}), 500
 
-    filename = build_pdf_filename(
-        source_dataset=decoded["source_dataset"],
-        theme=decoded["theme"],
-        section=decoded["section"],
-        episode=decoded["seed"],
-    )
-    resp = Response(pdf_bytes, mimetype="application/pdf")
-    resp.headers["Content-Disposition"] = f'inline; filename="{filename}"'
-    return resp
+    if etag is None:
+        etag = worksheet_pdf_etag(worksheet_id, decoded)
+    if etag:
+        store_cached_pdf(etag, pdf_bytes)
+    return send_pdf(pdf_bytes, filename, etag=etag)
 
 @app.route('/generate', methods=['POST'])
 def generate():
@@ -375,12 +592,7 @@ def generate():
         return jsonify({"error": "Missing required fields."}), 400
 
     # --- Custom theme branch: bypass Phase 2 entirely ---
-    app_config = get_app_config()
-    theme_entry = None
-    for t in app_config["themes"]:
-        if t["id"] == theme:
-            theme_entry = t
-            break
+    theme_entry = get_static_config()["themes_by_id"].get(theme)
 
     if theme_entry and theme_entry.get("key_name") == "user_specified":
         custom_text = raw_payload.get("custom_theme_text", "").strip()
@@ -401,17 +613,15 @@ def generate():
         }
 
         try:
-            phase3_output = run_phase3_with_json(json.dumps(custom_payload, ensure_ascii=False))
+            phase3_output = run_phase3_from_dict(custom_payload)
         except SystemExit as exc:
             return jsonify({"error": str(exc)}), 400
 
         try:
-            phase4_output = run_phase4_with_json(phase3_output, theme_content=theme_content)
-        except SystemExit as exc:
+            phase4_data = run_phase4_from_dict(phase3_output, theme_content=theme_content)
+        except (SystemExit, Phase4Error) as exc:
             return jsonify({"error": str(exc)}), 500
 
-        phase4_data = json.loads(phase4_output)
-
         # Add presentation_metadata with interpolated variables
         presentation_metadata = dict(raw_payload.get("presentation_metadata") or {})
         header_value = raw_payload.get("header") or raw_payload.get("header_text")
@@ -443,17 +653,12 @@ def generate():
                 "theme_abbr": "Custom",
             }
 
+            variables = {key: str(value) for key, value in presentation_variables.items()}
             interpolated_metadata = dict(presentation_metadata)
             for key in ("header", "footer", "answer_key_footer"):
-                if key in interpolated_metadata:
-                    template = interpolated_metadata[key]
-                    if template is None:
-                        continue
-                    text = str(template)
-                    for var_key, value in presentation_variables.items():
-                        placeholder = "{" + var_key + "}"
-                        text = text.replace(placeholder, str(value))
-                    interpolated_metadata[key] = text
+                template = interpolated_metadata.get(key)
+                if template is not None:
+                    interpolated_metadata[key] = interpolate_placeholders(str(template), variables)
 
             phase4_data["presentation_metadata"] = interpolated_metadata
 
@@ -461,15 +666,13 @@ def generate():
         phase4_data["worksheet_id"] = None
 
         try:
-            pdf_bytes = run_phase5_with_json(json.dumps(phase4_data, ensure_ascii=False))
+            pdf_bytes = render_pdf(phase4_data)
         except ValueError as exc:
             return jsonify({"error": f"Failed to build PDF: {exc}"}), 500
 
         send_ntfy_notification(theme_file_stem, episode_count)
 
-        resp = Response(pdf_bytes, mimetype="application/pdf")
-        resp.headers["Content-Disposition"] = 'inline; filename="custom-worksheet.pdf"'
-        return resp
+        return send_pdf(pdf_bytes, "custom-worksheet.pdf")
 
     # --- Standard theme flow (Phase 2) ---
     try:
@@ -514,15 +717,12 @@ def generate():
         payload["presentation_metadata"] = presentation_metadata
 
     try:
-        response_json = run_with_json(json.dumps(payload, ensure_ascii=False))
-        response_payload = json.loads(response_json)
+        response_payload = run_phase2_from_dict(payload)
     except Phase2Error as exc:
         return jsonify({"error": str(exc)}), 400
-    except json.JSONDecodeError as exc:
-        return jsonify({"error": f"Failed to parse phase2 response: {exc}"}), 500
 
     try:
-        pdf_bytes = run_phase5_with_json(response_json)
+        pdf_bytes = render_pdf(response_payload)
     except ValueError as exc:
         return jsonify({"error": f"Failed to build PDF: {exc}"}), 500
 
@@ -540,8 +740,7 @@ def generate():
         section=section,
         episode=next_episode,
     )
-    resp = Response(pdf_bytes, mimetype="application/pdf")
-    resp.headers["Content-Disposition"] = f'inline; filename="{filename}"'
+    resp = send_pdf(pdf_bytes, filename)
     if new_worksheet_id:
         resp.headers["X-Worksheet-Id"] = new_worksheet_id
     return resp
@@ -597,15 +796,12 @@ def fetch_episode():
     payload["reading_level"] = {"system": "fp", "level": payload["reading_level"]}
 
     try:
-        response_json = run_with_json(json.dumps(payload, ensure_ascii=False))
-        response_payload = json.loads(response_json)
+        response_payload = run_phase2_from_dict(payload)
     except Phase2Error as exc:
         return jsonify({"error": str(exc)}), 400
-    except json.JSONDecodeError as exc:
-        return jsonify({"error": f"Failed to parse phase2 response: {exc}"}), 500
 
     try:
-        pdf_bytes = run_phase5_with_json(response_json)
+        pdf_bytes = render_pdf(response_payload)
     except ValueError as exc:
         return jsonify({"error": f"Failed to build PDF: {exc}"}), 500
 
@@ -615,9 +811,7 @@ def fetch_episode():
         section=payload["section"],
         episode=payload["episode"],
     )
-    resp = Response(pdf_bytes, mimetype="application/pdf")
-    resp.headers["Content-Disposition"] = f'inline; filename="{filename}"'
-    return resp
+    return send_pdf(pdf_bytes, filename)
 
 @app.route('/about')
 def about():